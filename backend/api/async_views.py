@@ -0,0 +1,116 @@
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial, wraps
+from tempfile import SpooledTemporaryFile
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from api.performance import request_timings, timed
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Сколько байт потокового ответа держать в памяти, остальное на диске.
+SPOOL_MAX_SIZE = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+_executor = None
+_executor_lock = Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_READ_WORKERS,
+                thread_name_prefix='async-read',
+            )
+        return _executor
+
+
+def render_read(view, request, *args, **kwargs):
+    """ Весь ответ, включая рендеринг, готовится в потоке пула, циклу
+    событий остается только отдать байты клиенту. Итератор потокового
+    ответа читает базу, а в цикле событий это запрещено, поэтому он
+    проходится здесь же во временный файл, и цикл событий читает уже
+    файл. Соединения с базой в потоках пула живут по правилам
+    CONN_MAX_AGE, как в обычном обработчике запроса. """
+
+    close_old_connections()
+    timings = request_timings.get()
+    try:
+        with timings.track_queries() if timings else nullcontext():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, 'render'):
+                with timed('render'):
+                    response.render()
+            if response.streaming:
+                response.streaming_content = read_chunks(
+                    spool(response.streaming_content)
+                )
+        return response
+    finally:
+        close_old_connections()
+
+
+def run_write(view, request, *args, **kwargs):
+    timings = request_timings.get()
+    with timings.track_queries() if timings else nullcontext():
+        return view(request, *args, **kwargs)
+
+
+def spool(content):
+    """ В памяти не больше SPOOL_MAX_SIZE байт ответа """
+
+    file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    for chunk in content:
+        file.write(chunk)
+    file.seek(0)
+    return file
+
+
+def read_chunks(file):
+    with file:
+        yield from iter(partial(file.read, CHUNK_SIZE), b'')
+
+
+def async_read_view(view):
+    """ Асинхронная обертка над представлением DRF для ASGI.
+
+    Чтение выполняется в ограниченном пуле ASYNC_READ_WORKERS потоков:
+    медленный клиент или медленный запрос к базе занимает поток пула
+    только на время подготовки ответа, а не воркер целиком. Запросы с
+    изменением данных идут в представление как есть, в потоке запроса,
+    где работают транзакции и on_commit. """
+
+    write = sync_to_async(partial(run_write, view))
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await write(request, *args, **kwargs)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            get_executor(),
+            partial(context.run, render_read, view, request, *args, **kwargs)
+        )
+
+    return wrapper
+
+
+def async_read_urls(urlpatterns, viewsets):
+    """ Заменяет представления указанных вьюсетов асинхронными """
+
+    return [
+        URLPattern(
+            pattern.pattern, async_read_view(pattern.callback),
+            pattern.default_args, pattern.name
+        )
+        if getattr(pattern.callback, 'cls', None) in viewsets else pattern
+        for pattern in urlpatterns
+    ]
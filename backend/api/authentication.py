@@ -0,0 +1,81 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.cache import get_version, invalidate
+
+User = get_user_model()
+
+SNAPSHOT_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def token_cache_key(key):
+    return f'auth:token:{sha256(key.encode()).hexdigest()}'
+
+
+def user_namespace(user_id):
+    return f'auth:user:{user_id}'
+
+
+def invalidate_user(user_id):
+    """ Снимки пользователя во всех процессах перестают действовать """
+
+    invalidate(user_namespace(user_id))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """ TokenAuthentication без запроса к базе на каждый вызов.
+
+    По хешу токена в кеше лежит снимок пользователя: его id, версия
+    и поля из SNAPSHOT_FIELDS. Снимок действует AUTH_TOKEN_CACHE_TIMEOUT
+    секунд или до смены версии пользователя, которую повышают выход,
+    смена пароля, блокировка и правка пользователя. Остальные поля
+    пользователя отложены и загрузятся из базы при обращении, а
+    save() запишет только загруженные поля и не затрет счетчики.
+
+    Выход в одном воркере должен сбросить снимок во всех, поэтому без
+    общего кеша (SHARED_CACHE) токен проверяется по базе, как в
+    TokenAuthentication. """
+
+    def authenticate_credentials(self, key):
+        if not settings.SHARED_CACHE:
+            return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        snapshot = cache.get(cache_key)
+        if snapshot is not None:
+            user_id, version, values = snapshot
+            if version == get_version(user_namespace(user_id)):
+                user = self.restore(User, values)
+                token = self.restore(Token, {'key': key, 'user_id': user.pk})
+                token.user = user
+                return user, token
+        user, token = super().authenticate_credentials(key)
+        cache.set(
+            cache_key,
+            (
+                user.pk, get_version(user_namespace(user.pk)),
+                {field: getattr(user, field) for field in SNAPSHOT_FIELDS}
+            ),
+            settings.AUTH_TOKEN_CACHE_TIMEOUT
+        )
+        return user, token
+
+    @staticmethod
+    def restore(model, values):
+        """ Экземпляр модели из части полей, остальные отложены """
+
+        names = [
+            field.attname for field in model._meta.concrete_fields
+            if field.attname in values
+        ]
+        return model.from_db(
+            DEFAULT_DB_ALIAS, names, [values[name] for name in names]
+        )
@@ -0,0 +1,241 @@
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from hashlib import sha256
+from time import time, time_ns
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+from rest_framework.response import Response
+
+from foodgram_backend.db.routers import replica_alias
+
+CACHED_HEADERS = ('ETag', 'Last-Modified', 'Vary')
+
+
+def get_version(namespace):
+    """ Текущая версия данных пространства имен в общем кеше.
+
+    Начальная версия берется из времени, чтобы после вытеснения ключа
+    или очистки кеша она не совпала ни с одной из выданных раньше. """
+
+    key = f'{namespace}:version'
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(namespace):
+    """ Делает все ключи пространства имен недостижимыми """
+
+    key = f'{namespace}:version'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time_ns(), timeout=None)
+
+
+def invalidate(namespace):
+    """ Версия повышается сразу и повторно после коммита, чтобы
+    отбросить ответы, закешированные до фиксации транзакции """
+
+    def committed():
+        bump_version(namespace)
+        mark_written(namespace)
+        cache.set(f'{namespace}:changed_at', time(), timeout=None)
+
+    bump_version(namespace)
+    transaction.on_commit(committed)
+
+
+def get_changed_at(namespace):
+    """ Время последнего сброса пространства имен для Last-Modified.
+    Если ключ вытеснен, отсчет начинается заново с текущего момента """
+
+    key = f'{namespace}:changed_at'
+    cache.add(key, time(), timeout=None)
+    return datetime.fromtimestamp(cache.get(key), timezone.utc)
+
+
+def mark_written(namespace):
+    if settings.DATABASE_REPLICAS:
+        cache.set(
+            f'{namespace}:written', True, settings.REPLICA_STICKY_TIMEOUT
+        )
+
+
+@contextmanager
+def primary_if_written(namespace):
+    """ Данные для общего кеша вскоре после записи в пространство имен
+    читаются из основной базы: реплика могла еще не получить запись, и
+    устаревший ответ сохранился бы под новой версией """
+
+    if replica_alias.get() is None or not cache.get(f'{namespace}:written'):
+        yield
+        return
+    token = replica_alias.set(None)
+    try:
+        yield
+    finally:
+        replica_alias.reset(token)
+
+
+def count(namespace, event):
+    key = f'{namespace}:{event}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None)
+
+
+def get_stats(namespace):
+    hits = cache.get(f'{namespace}:hits', 0)
+    misses = cache.get(f'{namespace}:misses', 0)
+    return {
+        'version': get_version(namespace),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / (hits + misses) if hits + misses else 0,
+    }
+
+
+class AnonymousResponseCacheMixin:
+    """ Кеширует ответы list/retrieve для анонимных пользователей.
+
+    Ключ строится из версии пространства имен, действия, объекта и
+    нормализованных параметров запроса. Версию повышают сигналы
+    изменения данных, поэтому устаревшие ответы просто перестают
+    находиться. Запросы с параметрами вне cached_query_params не
+    кешируются. """
+
+    cache_namespace = None
+    cached_query_params = frozenset()
+
+    def get_cache_timeout(self):
+        return settings.RESPONSE_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def get_cache_key(self, request):
+        if request.user.is_authenticated:
+            return None
+        params = request.query_params
+        if not set(params) <= self.cached_query_params:
+            return None
+        normalized = '&'.join(
+            f'{name}={value}' for name in sorted(params)
+            for value in sorted(set(params.getlist(name)))
+        )
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        digest = sha256(
+            f'{request.scheme}://{request.get_host()}|{self.action}|'
+            f'{lookup}|{normalized}'.encode()
+        ).hexdigest()
+        return (
+            f'{self.cache_namespace}:'
+            f'{get_version(self.cache_namespace)}:{digest}'
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = self.get_cache_key(request)
+        if key is None:
+            return handler(request, *args, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            count(self.cache_namespace, 'hits')
+            data, headers = cached
+            response = not_modified(request, headers) or Response(data)
+            for header, value in headers.items():
+                response[header] = value
+            response['X-Cache'] = 'HIT'
+            return response
+        count(self.cache_namespace, 'misses')
+        with primary_if_written(self.cache_namespace):
+            response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            headers = {
+                header: response[header] for header in CACHED_HEADERS
+                if header in response
+            }
+            cache.set(
+                key, (response.data, headers), self.get_cache_timeout()
+            )
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+def make_etag(request, *parts):
+    """ Сильный ETag: представление зависит от состояния данных, адреса
+    запроса, хоста в абсолютных ссылках и формата ответа """
+
+    state = '|'.join(map(str, (
+        request.get_host(), request.get_full_path(),
+        request.accepted_renderer.format, *parts
+    )))
+    return f'"{sha256(state.encode()).hexdigest()}"'
+
+
+def not_modified(request, headers):
+    """ Ответ 304 (или 412), если валидаторы совпали с условием запроса """
+
+    last_modified = headers.get('Last-Modified')
+    return get_conditional_response(
+        request,
+        etag=headers.get('ETag'),
+        last_modified=last_modified and parse_http_date_safe(last_modified),
+    )
+
+
+class ConditionalResponseMixin:
+    """ ETag и Last-Modified для list/retrieve.
+
+    Валидаторы считаются дешевым запросом до сериализации, при
+    совпадении с If-None-Match или If-Modified-Since ответ 304 отдается
+    без нее. get_list_validators и get_detail_validators возвращают пару
+    (etag, last_modified) или None, если условный ответ не нужен. """
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_list_validators, super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.get_detail_validators, super().retrieve,
+            request, *args, **kwargs
+        )
+
+    def get_list_validators(self, request):
+        return None
+
+    def get_detail_validators(self, request):
+        return None
+
+    def conditional_response(self, get_validators, handler, request,
+                             *args, **kwargs):
+        validators = get_validators(request)
+        if validators is None:
+            return handler(request, *args, **kwargs)
+        etag, last_modified = validators
+        headers = {'ETag': etag}
+        if last_modified is not None:
+            headers['Last-Modified'] = http_date(last_modified.timestamp())
+        response = (
+            not_modified(request, headers)
+            or handler(request, *args, **kwargs)
+        )
+        if response.status_code in (200, 304):
+            for header, value in headers.items():
+                response[header] = value
+        patch_vary_headers(response, ('Authorization',))
+        return response
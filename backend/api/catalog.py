@@ -0,0 +1,185 @@
+import json
+from bisect import bisect_left
+from functools import lru_cache
+from hashlib import sha256
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
+
+from api.cache import (
+    get_version, invalidate, make_etag, not_modified, primary_if_written
+)
+from api.serializers import IngredientSerializer, TagSerializer
+from recipes.models import Ingredient, Tag
+
+
+class Snapshot:
+    """ Неизменяемое состояние справочника на одну версию данных """
+
+    __slots__ = ('version', 'built', 'data', 'by_id', 'etag')
+
+    def __init__(self, version, data):
+        self.version = version
+        self.built = monotonic()
+        self.data = tuple(data)
+        self.by_id = {item['id']: item for item in self.data}
+        self.etag = sha256(json.dumps(
+            self.data, cls=DjangoJSONEncoder, ensure_ascii=False
+        ).encode()).hexdigest()
+
+
+class ReferenceSnapshot:
+    """ Справочник в памяти процесса.
+
+    Снимок строится одним запросом и отдается без обращения к базе,
+    пока версия пространства имен в общем кеше не изменится. Версию
+    повышают сигналы изменения модели, так что снимки всех процессов
+    устаревают одновременно. Сериализованные данные снимка не
+    изменяются, их можно отдавать в ответ как есть. """
+
+    namespace = None
+    model = None
+    serializer_class = None
+    snapshot_class = Snapshot
+
+    def __init__(self):
+        self._lock = Lock()
+        self._snapshot = None
+
+    def invalidate(self):
+        invalidate(self.namespace)
+
+    def get(self):
+        version = get_version(self.namespace)
+        snapshot = self._snapshot
+        if self.is_stale(snapshot, version):
+            with self._lock:
+                snapshot = self._snapshot
+                if self.is_stale(snapshot, version):
+                    with primary_if_written(self.namespace):
+                        snapshot = self._snapshot = self.build(version)
+        return snapshot
+
+    @staticmethod
+    def is_stale(snapshot, version):
+        """ Срок жизни нужен, когда кеш не общий для процессов и версия
+        из другого процесса сюда не доходит """
+
+        return (
+            snapshot is None
+            or snapshot.version != version
+            or monotonic() - snapshot.built
+            > settings.REFERENCE_SNAPSHOT_TIMEOUT
+        )
+
+    def build(self, version):
+        return self.snapshot_class(
+            version, self.serialize(self.model.objects.all())
+        )
+
+    def serialize(self, queryset):
+        return self.serializer_class(queryset, many=True).data
+
+
+class TagSnapshot(ReferenceSnapshot):
+    namespace = 'tags'
+    model = Tag
+    serializer_class = TagSerializer
+
+
+class IngredientSnapshot(Snapshot):
+    """ Снимок ингредиентов с названиями в нижнем регистре для поиска """
+
+    __slots__ = ('names',)
+
+    def __init__(self, version, data):
+        super().__init__(version, data)
+        self.names = tuple(item['name'].lower() for item in self.data)
+
+
+class IngredientCatalog(ReferenceSnapshot):
+    """ Справочник ингредиентов для автодополнения.
+
+    Поиск идет по отсортированным названиям снимка без блокировки,
+    результаты по частым префиксам кешируются до смены снимка. """
+
+    namespace = 'ingredients'
+    model = Ingredient
+    serializer_class = IngredientSerializer
+    snapshot_class = IngredientSnapshot
+
+    def __init__(self, cache_size=1024):
+        super().__init__()
+        self._search = lru_cache(maxsize=cache_size)(self._find)
+
+    def build(self, version):
+        snapshot = super().build(version)
+        self._search.cache_clear()
+        return snapshot
+
+    def serialize(self, queryset):
+        return sorted(
+            super().serialize(queryset),
+            key=lambda item: item['name'].lower()
+        )
+
+    def search(self, query):
+        return self._search(self.get(), query.strip().lower())
+
+    @staticmethod
+    def _find(snapshot, query):
+        names, ingredients = snapshot.names, snapshot.data
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+        start = bisect_left(names, query)
+        end = bisect_left(names, query + '\uffff', start)
+        prefixed = sorted(
+            range(start, end), key=lambda index: names[index] != query
+        )
+        found = [ingredients[index] for index in prefixed[:limit]]
+        if len(found) < limit:
+            found.extend(
+                ingredients[index] for index in range(len(names))
+                if query in names[index] and not start <= index < end
+            )
+        return tuple(found[:limit])
+
+
+class ReferenceSnapshotMixin:
+    """ list и retrieve справочника из снимка.
+
+    Ответ получает сильный ETag, на совпадающий If-None-Match
+    возвращается 304 без обращения к базе. """
+
+    snapshot = None
+
+    def list(self, request, *args, **kwargs):
+        return self.snapshot_response(
+            request, lambda snapshot: snapshot.data
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+
+        def find(snapshot):
+            try:
+                return snapshot.by_id[int(lookup)]
+            except (KeyError, ValueError):
+                raise NotFound
+
+        return self.snapshot_response(request, find)
+
+    def snapshot_response(self, request, select):
+        snapshot = self.snapshot.get()
+        data = select(snapshot)
+        etag = make_etag(request, snapshot.etag)
+        response = not_modified(request, {'ETag': etag}) or Response(data)
+        response['ETag'] = etag
+        return response
+
+
+tag_snapshot = TagSnapshot()
+ingredient_catalog = IngredientCatalog()
@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches, Tags.database)
+def check_shared_cache(app_configs, **kwargs):
+    """ Запись закрепляет пользователя за основной базой через кеш.
+    Локальный кеш процесса остальные воркеры не видят """
+
+    if settings.SHARED_CACHE or not settings.DATABASE_REPLICAS:
+        return []
+    return [Error(
+        'Чтение из реплик без общего кеша: после записи пользователь '
+        'закрепляется за основной базой только в одном воркере',
+        hint='Задайте REDIS_URL',
+        id='api.E002',
+    )]
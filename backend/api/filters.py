@@ -1,15 +1,24 @@
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections, models
 from django_filters import rest_framework as filters
 
 from recipes.models import Ingredient, Recipe, Tag
 
 
 class IngredientFilter(filters.FilterSet):
-    name = filters.CharFilter(field_name='name', lookup_expr='icontains')
+    name = filters.CharFilter(method='search')
 
     class Meta:
         model = Ingredient
         fields = ('name',)
 
+    def search(self, queryset, name, value):
+        return Ingredient.objects.search(value, queryset=queryset)
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
 
 class RecipeFilter(filters.FilterSet):
     tags = filters.ModelMultipleChoiceFilter(
@@ -23,10 +32,16 @@ class RecipeFilter(filters.FilterSet):
     is_favorited = filters.BooleanFilter(
         method='get_is_favorited'
     )
+    search = filters.CharFilter(method='get_search')
+    max_missing = filters.NumberFilter(method='get_max_missing', min_value=0)
+    ingredients = NumberInFilter(method='get_can_cook')
 
     class Meta:
         model = Recipe
-        fields = ('tags', 'is_in_shopping_cart', 'is_favorited')
+        fields = (
+            'tags', 'is_in_shopping_cart', 'is_favorited', 'search',
+            'max_missing', 'ingredients'
+        )
 
     def get_is_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value:
@@ -37,3 +52,65 @@ class RecipeFilter(filters.FilterSet):
         if self.request.user.is_authenticated and value:
             return queryset.filter(shopping_cart__user=self.request.user)
         return queryset
+
+    def get_search(self, queryset, name, value):
+        """ Полнотекстовый поиск по названию и описанию, самые
+        релевантные рецепты первыми. Вектор в PostgreSQL поддерживает
+        триггер, на других базах поиск идет по вхождению подстроки """
+
+        value = value.strip()
+        if not value:
+            return queryset
+        if connections[queryset.db].vendor == 'postgresql':
+            query = SearchQuery(
+                value, config='russian', search_type='websearch'
+            )
+            queryset = queryset.filter(search_vector=query).annotate(
+                search_rank=SearchRank(models.F('search_vector'), query)
+            )
+        else:
+            queryset = queryset.filter(
+                models.Q(name__icontains=value)
+                | models.Q(text__icontains=value)
+            ).annotate(
+                search_rank=models.Case(
+                    models.When(name__icontains=value, then=1.0),
+                    default=0.0,
+                    output_field=models.FloatField(),
+                )
+            )
+        return queryset.order_by('-search_rank', '-pub_date', '-id')
+
+    def get_max_missing(self, queryset, name, value):
+        """ Учитывается вместе с ingredients """
+
+        return queryset
+
+    def get_can_cook(self, queryset, name, value):
+        """ Рецепты, для которых из ingredients=1,2,3 не хватает не
+        больше max_missing ингредиентов: сначала те, где не хватает
+        меньше, затем с большим числом совпадений.
+
+        Строки состава выбираются по индексу (ingredient, recipe) и
+        считаются одной группировкой, недостающие — разница с
+        хранимым числом ингредиентов рецепта. """
+
+        if not value:
+            return queryset
+        ingredient_ids = set(int(ingredient_id) for ingredient_id in value)
+        max_missing = int(self.form.cleaned_data.get('max_missing') or 0)
+        return queryset.filter(
+            ingredients_count__lte=len(ingredient_ids) + max_missing,
+            ingredients_in_recipe__ingredient_id__in=ingredient_ids,
+        ).annotate(
+            matched_ingredients=models.Count(
+                'ingredients_in_recipe', distinct=True
+            ),
+        ).annotate(
+            missing_ingredients=models.F('ingredients_count')
+            - models.F('matched_ingredients'),
+        ).filter(
+            missing_ingredients__lte=max_missing
+        ).order_by(
+            'missing_ingredients', '-matched_ingredients', '-pub_date', '-id'
+        )
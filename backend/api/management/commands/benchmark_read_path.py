@@ -0,0 +1,187 @@
+import http.client
+import socket
+import threading
+import time
+from itertools import cycle
+from statistics import quantiles
+from urllib.parse import quote, urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_PATHS = (
+    '/api/recipes/?limit=6',
+    '/api/recipes/?limit=6&cursor=',
+    '/api/tags/',
+    '/api/ingredients/?name=%D1%81%D0%BE%D0%BB',
+)
+
+
+def process_rss(pid):
+    """ Память процесса и всех его потомков в байтах по /proc """
+
+    total = 0
+    pids = [pid]
+    while pids:
+        current = pids.pop()
+        try:
+            with open(f'/proc/{current}/status') as status:
+                for line in status:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+            with open(f'/proc/{current}/task/{current}/children') as file:
+                pids.extend(int(child) for child in file.read().split())
+        except (OSError, ValueError):
+            continue
+    return total
+
+
+class Command(BaseCommand):
+    """ Нагрузочный замер пути чтения API. """
+
+    help = (
+        'Отправляет GET-запросы к запущенному серверу из заданного числа '
+        'потоков и выводит пропускную способность, задержки и память '
+        'процессов сервера. Запускается по очереди против WSGI '
+        '(gunicorn) и ASGI (gunicorn с UvicornWorker и '
+        'ASYNC_READ_VIEWS=True), число воркеров подбирается так, чтобы '
+        'память была одинаковой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('base_url', help='Например http://127.0.0.1:8000')
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Путь для запросов, можно указать несколько раз'
+        )
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--duration', type=float, default=10)
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument(
+            '--token', help='Токен для запросов авторизованного пользователя'
+        )
+        parser.add_argument(
+            '--slow-clients', type=int, default=0,
+            help='Соединения, которые передают запрос по байту в секунду'
+        )
+        parser.add_argument(
+            '--pid', type=int, action='append', dest='pids', default=[],
+            help='PID мастер-процесса сервера для замера памяти'
+        )
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['base_url'])
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise CommandError('Укажите адрес вида http://host:port')
+        self.url = url
+        self.timeout = options['timeout']
+        self.headers = {'Accept': 'application/json'}
+        if options['token']:
+            self.headers['Authorization'] = f'Token {options["token"]}'
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.latencies, self.errors = [], 0
+        paths = cycle(
+            quote(path, safe="/?&=%:+,") for path
+            in options['paths'] or DEFAULT_PATHS
+        )
+
+        threads = [
+            threading.Thread(target=self.slow_client, daemon=True)
+            for _ in range(options['slow_clients'])
+        ] + [
+            threading.Thread(
+                target=self.client, args=(next(paths),), daemon=True
+            )
+            for _ in range(options['concurrency'])
+        ]
+        peak_rss = 0
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        while time.monotonic() - started < options['duration']:
+            time.sleep(0.5)
+            peak_rss = max(
+                peak_rss, sum(process_rss(pid) for pid in options['pids'])
+            )
+        self.stop.set()
+        for thread in threads:
+            thread.join(self.timeout)
+        elapsed = time.monotonic() - started
+        self.report(elapsed, peak_rss, options)
+
+    def connection(self):
+        connection_class = (
+            http.client.HTTPSConnection if self.url.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        return connection_class(
+            self.url.hostname, self.url.port, timeout=self.timeout
+        )
+
+    def client(self, path):
+        connection = self.connection()
+        while not self.stop.is_set():
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=self.headers)
+                response = connection.getresponse()
+                response.read()
+                failed = response.status >= 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = self.connection()
+                failed = True
+            latency = time.perf_counter() - started
+            with self.lock:
+                if failed:
+                    self.errors += 1
+                else:
+                    self.latencies.append(latency)
+        connection.close()
+
+    def slow_client(self):
+        """ Клиент на медленном канале: держит соединение, передавая
+        заголовки запроса по одному байту """
+
+        request = (
+            f'GET {DEFAULT_PATHS[0]} HTTP/1.1\r\n'
+            f'Host: {self.url.netloc}\r\n\r\n'
+        ).encode()
+        while not self.stop.is_set():
+            try:
+                with socket.create_connection(
+                    (self.url.hostname, self.url.port or 80), self.timeout
+                ) as sock:
+                    for byte in request:
+                        if self.stop.wait(1):
+                            return
+                        sock.send(bytes((byte,)))
+                    sock.recv(65536)
+            except OSError:
+                if self.stop.wait(1):
+                    return
+
+    def report(self, elapsed, peak_rss, options):
+        latencies = sorted(self.latencies)
+        total = len(latencies)
+        self.stdout.write(
+            f'Сервер: {self.url.geturl()}, потоков {options["concurrency"]}, '
+            f'медленных клиентов {options["slow_clients"]}'
+        )
+        self.stdout.write(
+            f'Ответов: {total}, ошибок: {self.errors}, '
+            f'{total / elapsed:.1f} запросов/с'
+        )
+        if total > 1:
+            percentiles = quantiles(latencies, n=100)
+            self.stdout.write(
+                'Задержка, мс: '
+                f'p50 {percentiles[49] * 1000:.1f}, '
+                f'p95 {percentiles[94] * 1000:.1f}, '
+                f'p99 {percentiles[98] * 1000:.1f}, '
+                f'max {latencies[-1] * 1000:.1f}'
+            )
+        if options['pids']:
+            self.stdout.write(
+                f'Пиковая память сервера: {peak_rss / 2 ** 20:.1f} МБ'
+            )
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import bump_version, get_stats
+
+
+class Command(BaseCommand):
+    """ Статистика и сброс кеша ответов API. """
+
+    help = (
+        'Показывает попадания и промахи кеша ответов, с --invalidate '
+        'повышает версии пространств имен.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'namespaces', nargs='*', default=['recipes'],
+            help='Пространства имен: recipes, tags, ingredients'
+        )
+        parser.add_argument(
+            '--invalidate', action='store_true',
+            help='Сделать устаревшими все закешированные ответы'
+        )
+
+    def handle(self, *args, **options):
+        for namespace in options['namespaces']:
+            if options['invalidate']:
+                bump_version(namespace)
+            stats = get_stats(namespace)
+            self.stdout.write(
+                f'{namespace}: версия {stats["version"]}, '
+                f'попаданий {stats["hits"]}, промахов {stats["misses"]}, '
+                f'доля попаданий {stats["hit_ratio"]:.1%}'
+            )
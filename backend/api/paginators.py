@@ -1,6 +1,182 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from functools import reduce
+from operator import itemgetter, or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class CustomPageNumberPaginator(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+
+
+class KeysetPaginator(BasePagination):
+    """ Постраничный вывод по курсору без OFFSET и COUNT(*).
+
+    Курсор хранит значения полей сортировки последнего объекта страницы,
+    следующая страница выбирается условием «после него» по индексу.
+    Поля сортировки берутся из keyset_ordering вьюсета, последним
+    полем должен идти уникальный ключ. Выборку с другой сортировкой,
+    например по релевантности поиска, курсор не разбивает на страницы:
+    ее порядок он бы молча заменил своим. """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = 6
+    max_page_size = 100
+    ordering = ('-pub_date', '-id')
+    invalid_cursor_message = 'Неверный курсор'
+    ordered_queryset_message = (
+        'Курсор нельзя сочетать с сортировкой по релевантности, '
+        'используйте номера страниц'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        if queryset.query.order_by and (
+            tuple(queryset.query.order_by) != tuple(self.ordering)
+        ):
+            raise ParseError(self.ordered_queryset_message)
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(queryset.model)
+        return self.set_page(
+            self.page_rows(queryset, self.ordering, position)
+        )
+
+    def page_rows(self, queryset, ordering, position):
+        """ Строки страницы и одна сверх нее — признак следующей """
+
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, ordering))
+        return list(queryset[:self.page_size + 1])
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = [str(value) for value in self.position_of(self.page[-1])]
+        cursor = urlsafe_b64encode(json.dumps(position).encode()).decode()
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def position_of(self, item):
+        return [getattr(item, field.lstrip('-')) for field in self.ordering]
+
+    def decode_cursor(self, model, ordering=None):
+        ordering = ordering or self.ordering
+        cursor = self.request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            values = json.loads(urlsafe_b64decode(cursor.encode()))
+            if len(values) != len(ordering):
+                raise ValueError
+            return [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def after(self, position, ordering=None):
+        """ (a, b, c) после (x, y, z): a > x, или a = x и b > y, и т.д. с
+        учетом направления сортировки каждого поля. Условие a >= x перед
+        ними ограничивает просмотр индекса началом с позиции курсора """
+
+        ordering = ordering or self.ordering
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        bound = Q(**{f'{first.lstrip("-")}__{lookup}': position[0]})
+        conditions = []
+        for index, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): value for previous, value
+                in zip(ordering[:index], position[:index])
+            }
+            conditions.append(
+                Q(**equal, **{f'{name}__{lookup}': position[index]})
+            )
+        return bound & reduce(or_, conditions)
+
+
+class MergedKeysetPaginator(KeysetPaginator):
+    """ Страница по курсору из нескольких выборок values_list с одними
+    ключами сортировки под своими именами полей, например датой
+    публикации и рецептом у записей ленты и у самих рецептов.
+
+    Направления сортировки берутся из keyset_ordering вьюсета. Каждая
+    выборка читается своим запросом с LIMIT по своему индексу, строки
+    сливаются без повторов. Элементы страницы — кортежи ключей. """
+
+    def paginate_queryset(self, querysets, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+        orderings = [
+            [
+                f'-{name}' if field.startswith('-') else name
+                for field, name in zip(
+                    self.ordering, queryset.query.values_select
+                )
+            ]
+            for queryset in querysets
+        ]
+        position = self.decode_cursor(querysets[0].model, orderings[0])
+        rows = []
+        for queryset, ordering in zip(querysets, orderings):
+            rows.extend(self.page_rows(queryset, ordering, position))
+        for index in reversed(range(len(self.ordering))):
+            rows.sort(
+                key=itemgetter(index),
+                reverse=self.ordering[index].startswith('-')
+            )
+        return self.set_page(list(dict.fromkeys(rows))[:self.page_size + 1])
+
+    def position_of(self, item):
+        return item
+
+
+class CursorOrPageNumberPaginator(CustomPageNumberPaginator):
+    """ Номера страниц по умолчанию, курсор при наличии ?cursor= """
+
+    cursor_paginator_class = KeysetPaginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        cursor_paginator = self.cursor_paginator_class()
+        if cursor_paginator.cursor_query_param in request.query_params:
+            self.cursor_paginator = cursor_paginator
+            return cursor_paginator.paginate_queryset(queryset, request, view)
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
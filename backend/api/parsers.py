@@ -0,0 +1,89 @@
+import json
+import mimetypes
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.utils.datastructures import MultiValueDict
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import (
+    DataAndFiles, FileUploadParser, MultiPartParser
+)
+
+
+class RequestEntityTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Файл слишком большой'
+    default_code = 'request_entity_too_large'
+
+
+class LimitedTemporaryFileUploadHandler(TemporaryFileUploadHandler):
+    """ Пишет загружаемые файлы сразу во временный файл на диске и
+    обрывает загрузку ответом 413, как только превышен лимит """
+
+    def __init__(self, request=None, max_size=None):
+        super().__init__(request)
+        self.max_size = max_size or settings.RECIPE_UPLOAD_MAX_SIZE
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length and content_length > self.max_size:
+            raise RequestEntityTooLarge()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.file.close()
+            raise RequestEntityTooLarge()
+        return super().receive_data_chunk(raw_data, start)
+
+
+class UploadedFiles(MultiValueDict):
+    """ dict.update() копирует из подкласса dict внутренние списки в
+    обход __getitem__, если не переопределен __iter__. Request.data
+    собирается именно так, и вместо файла в поле попадал бы список """
+
+    def __iter__(self):
+        return super().__iter__()
+
+
+class MultiPartJSONParser(MultiPartParser):
+    """ multipart/form-data, в котором вложенные поля переданы
+    JSON-строками: tags=[1, 2], ingredients=[{"id": 1, "amount": 10}].
+    Разбираются только поля из json_fields, текст рецепта в виде
+    JSON-массива остается строкой. Повторяющиеся поля собираются в
+    список. """
+
+    json_fields = frozenset(('tags', 'ingredients'))
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parsed = super().parse(stream, media_type, parser_context)
+        data = {}
+        for key, values in parsed.data.lists():
+            if key in self.json_fields:
+                values = [self.decode(value) for value in values]
+            data[key] = values if len(values) > 1 else values[0]
+        return DataAndFiles(data, UploadedFiles(parsed.files))
+
+    @staticmethod
+    def decode(value):
+        if value[:1] in ('[', '{'):
+            try:
+                return json.loads(value)
+            except ValueError:
+                pass
+        return value
+
+
+class ImageUploadParser(FileUploadParser):
+    """ Тело запроса целиком — изображение, имя файла необязательно """
+
+    media_type = 'image/*'
+
+    def get_filename(self, stream, media_type, parser_context):
+        filename = super().get_filename(stream, media_type, parser_context)
+        if filename:
+            return filename
+        extension = mimetypes.guess_extension(
+            parser_context['request'].content_type.split(';')[0]
+        )
+        return f'upload{extension or ""}'
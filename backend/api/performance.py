@@ -0,0 +1,195 @@
+import json
+import logging
+import random
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+request_timings = ContextVar('request_timings', default=None)
+
+STAGES = ('db', 'serialize', 'render')
+
+
+class RequestTimings:
+    """ Метрики одного запроса: число и время SQL-запросов, время
+    сериализации и рендеринга ответа. Вложенные замеры одного этапа не
+    суммируются, время сериализации включает запросы сериализаторов """
+
+    def __init__(self):
+        self.tag = None
+        self.queries = 0
+        self.durations = dict.fromkeys(STAGES, 0.0)
+        self.running = set()
+
+    def execute(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.durations['db'] += perf_counter() - started
+
+    @contextmanager
+    def track_queries(self):
+        """ Учитывает запросы текущего потока ко всем базам """
+
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(
+                    connections[alias].execute_wrapper(self.execute)
+                )
+            yield
+
+    def server_timing(self, total):
+        metrics = [f'total;dur={total * 1000:.1f}']
+        for stage in STAGES:
+            metric = f'{stage};dur={self.durations[stage] * 1000:.1f}'
+            if stage == 'db':
+                metric += f';desc="{self.queries} queries"'
+            metrics.append(metric)
+        if self.tag:
+            metrics.append(f'view;desc="{self.tag}"')
+        return ', '.join(metrics)
+
+    def as_dict(self, total):
+        return {
+            'view': self.tag,
+            'duration_ms': round(total * 1000, 1),
+            'queries': self.queries,
+            **{
+                f'{stage}_ms': round(self.durations[stage] * 1000, 1)
+                for stage in STAGES
+            },
+        }
+
+
+@contextmanager
+def timed(stage):
+    timings = request_timings.get()
+    if timings is None or stage in timings.running:
+        yield
+        return
+    timings.running.add(stage)
+    started = perf_counter()
+    try:
+        yield
+    finally:
+        timings.durations[stage] += perf_counter() - started
+        timings.running.discard(stage)
+
+
+class TimedSerializerMixin:
+    """ Время сериализации ответа попадает в метрики запроса """
+
+    def to_representation(self, instance):
+        if request_timings.get() is None:
+            return super().to_representation(instance)
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+def view_tag(view_func, method):
+    """ basename.action для вьюсетов, например recipes.list """
+
+    actions = getattr(view_func, 'actions', None)
+    basename = getattr(view_func, 'initkwargs', {}).get('basename')
+    if actions and basename:
+        return f'{basename}.{actions.get(method.lower(), method.lower())}'
+    return f'{view_func.__module__}.{view_func.__name__}'
+
+
+class PerformanceMiddleware:
+    """ Метрики производительности для доли PERFORMANCE_SAMPLE_RATE
+    запросов: заголовок Server-Timing и строка JSON в лог
+    api.performance. При нулевой доле middleware отключается.
+
+    Под ASGI middleware работает асинхронно и не переводит запросы в
+    поток. Запросы к базе там учитываются в потоках, где выполняются
+    представления из async_read_urls. Запросы потокового ответа,
+    выполненные при его отдаче, и запросы из других потоков не
+    учитываются. """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.PERFORMANCE_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.process_view_async
+            self.process_template_response = (
+                self.process_template_response_async
+            )
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            return self.get_response(request)
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        started = perf_counter()
+        try:
+            with timings.track_queries():
+                response = self.get_response(request)
+        finally:
+            request_timings.reset(token)
+        return self.report(request, response, timings, started)
+
+    async def __acall__(self, request):
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            return await self.get_response(request)
+        timings = RequestTimings()
+        token = request_timings.set(timings)
+        started = perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            request_timings.reset(token)
+        return self.report(request, response, timings, started)
+
+    @staticmethod
+    def report(request, response, timings, started):
+        total = perf_counter() - started
+        response['Server-Timing'] = timings.server_timing(total)
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **timings.as_dict(total),
+        }, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = request_timings.get()
+        if timings is not None:
+            timings.tag = view_tag(view_func, request.method)
+
+    async def process_view_async(self, *args):
+        return PerformanceMiddleware.process_view(self, *args)
+
+    def process_template_response(self, request, response):
+        """ Вызывается перед рендерингом ответа DRF, время до
+        post_render_callback — рендеринг """
+
+        timings = request_timings.get()
+        if timings is not None and not response.is_rendered:
+            started = perf_counter()
+
+            def rendered(response):
+                timings.durations['render'] += perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    async def process_template_response_async(self, *args):
+        return PerformanceMiddleware.process_template_response(self, *args)
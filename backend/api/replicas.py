@@ -0,0 +1,57 @@
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram_backend.db.routers import replica_alias
+
+
+def sticky_key(user_id):
+    return f'replica:sticky:{user_id}'
+
+
+def stick_to_primary(user_id):
+    """ Пользователь какое-то время читает из основной базы и видит
+    свои изменения, пока реплики их догоняют """
+
+    cache.set(sticky_key(user_id), True, settings.REPLICA_STICKY_TIMEOUT)
+
+
+class ReplicaReadMixin:
+    """ Безопасные запросы читают из реплики, выбранной на весь запрос.
+
+    После успешного изменяющего запроса пользователь на
+    REPLICA_STICKY_TIMEOUT секунд закрепляется за основной базой.
+    Аутентификация и проверка прав выполняются до выбора реплики. """
+
+    def dispatch(self, request, *args, **kwargs):
+        token = replica_alias.set(None)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            replica_alias.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.use_replica(request):
+            replica_alias.set(random.choice(settings.DATABASE_REPLICAS))
+
+    def use_replica(self, request):
+        if (
+            not settings.DATABASE_REPLICAS
+            or request.method not in SAFE_METHODS
+        ):
+            return False
+        user = request.user
+        return not (user.is_authenticated and cache.get(sticky_key(user.pk)))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method not in SAFE_METHODS
+            and response.status_code < 400
+            and request.user.is_authenticated
+        ):
+            stick_to_primary(request.user.pk)
+        return super().finalize_response(request, response, *args, **kwargs)
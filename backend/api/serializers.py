@@ -1,15 +1,23 @@
+from collections import Counter
+from uuid import uuid4
+
 from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import UploadedFile
 from django.db.transaction import atomic
-from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from api.cache import invalidate
+from api.performance import TimedSerializerMixin
+from recipes import images
+from recipes.images import is_pending
 from recipes.models import (
-    Favorite, Ingredient, IngredientAmount, Recipe,
-    ShoppingCart, Tag
+    Favorite, FeedEntry, Ingredient, IngredientAmount, Recipe,
+    ShoppingCart, ShoppingListItem, Tag, amount_deltas
 )
+from recipes.signals import change_recipes_count
 from users.models import Subscription
 
 User = get_user_model()
@@ -24,30 +32,74 @@ class RegistrationSerializer(UserCreateSerializer):
                   'last_name', 'password')
 
 
-class CustomUserSerializer(UserSerializer):
+class CustomUserSerializer(TimedSerializerMixin, UserSerializer):
     """ Сериализатор пользователя """
 
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
         fields = ('email', 'id', 'username', 'first_name',
-                  'last_name', 'is_subscribed')
+                  'last_name', 'is_subscribed', 'recipes_count',
+                  'followers_count', 'following_count')
+        read_only_fields = ('recipes_count', 'followers_count',
+                            'following_count')
         model = User
 
     def get_is_subscribed(self, obj):
         user = self.context.get('request').user
-        return (
-            user.is_authenticated
-            and user != obj
-            and user.follower.filter(author=obj).exists()
-        )
+        if not user.is_authenticated or user == obj:
+            return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        return user.follower.filter(author=obj).exists()
+
+
+class ImageRenditionsField(serializers.Field):
+    """ Ссылки на уменьшенные копии изображения рецепта по размерам и
+    форматам. Пока копии нового изображения не готовы — пустой объект """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if is_pending(recipe):
+            return {}
+        request = self.context.get('request')
+        storage = recipe.image.storage
+        url = request.build_absolute_uri if request else str
+        return {
+            size: {
+                extension: url(storage.url(name))
+                for extension, name in files.items()
+            }
+            for size, files in recipe.renditions.items() if size != 'source'
+        }
+
+
+class RecipeImageField(Base64ImageField):
+    """ Изображение base64-строкой в JSON или файлом из multipart и
+    бинарной загрузки """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, UploadedFile):
+            return super().to_internal_value(data)
+        image = serializers.ImageField.to_internal_value(self, data)
+        extension = (image.image.format or '').lower()
+        if extension not in self.ALLOWED_TYPES:
+            raise serializers.ValidationError(self.INVALID_TYPE_MESSAGE)
+        image.name = f'{uuid4()}.{extension}'
+        return image
 
 
 class RecipeUserSerializer(serializers.ModelSerializer):
     """ Сериализатор рецептов пользователя """
 
+    images = ImageRenditionsField()
+
     class Meta:
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
         model = Recipe
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
 
@@ -76,37 +128,30 @@ class SubscriptionsSerializer(CustomUserSerializer):
     """ Сериализатор для вывода подписок """
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta(CustomUserSerializer.Meta):
         fields = (
             'email', 'id', 'username', 'first_name',
-            'last_name', 'is_subscribed', 'recipes', 'recipes_count'
-        )
-        read_only_fields = (
-            'email', 'id', 'username', 'first_name',
-            'last_name', 'is_subscribed', 'recipes', 'recipes_count'
+            'last_name', 'is_subscribed', 'recipes', 'recipes_count',
+            'followers_count', 'following_count'
         )
+        read_only_fields = fields
 
     def get_is_subscribed(self, obj):
         return True
 
     def get_recipes(self, obj):
-        recipes_limit = (
-            self.context['request'].query_params.get('recipes_limit')
-        )
-        recipes = obj.recipes.all()
+        recipes = self.context['recipes_by_author'].get(obj.pk, ())
+        return RecipeUserSerializer(recipes, many=True).data
 
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
 
-        return RecipeUserSerializer(recipes, many=True).data
+class RecipesLimitSerializer(serializers.Serializer):
+    """ Параметр recipes_limit списка подписок """
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
+    recipes_limit = serializers.IntegerField(min_value=1, required=False)
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """ Сериализатор тегов """
 
     class Meta:
@@ -115,7 +160,8 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'name', 'color', 'slug')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
     """ Сериализатор ингредиентов """
 
     class Meta:
@@ -137,7 +183,7 @@ class IngredientAmountSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit', 'amount',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """ Сериализатор отображения рецептов """
 
     tags = TagSerializer(read_only=True, many=True)
@@ -150,16 +196,18 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.BooleanField(default=False)
     is_in_shopping_cart = serializers.BooleanField(default=False)
     image = Base64ImageField(max_length=512, use_url=True)
+    images = ImageRenditionsField()
 
     class Meta:
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'images', 'text', 'cooking_time',
+            'favorites_count'
         )
         read_only_fields = (
             'id', 'tags', 'author', 'ingredients',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'text', 'cooking_time', 'favorites_count'
         )
         model = Recipe
 
@@ -175,17 +223,115 @@ class AddIngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
+def existing_ids(model, ids):
+    return set(
+        model.objects.filter(pk__in=ids).values_list('pk', flat=True)
+    )
+
+
+def collect_ids(items, field, key=None):
+    """ id из сырых данных пакета, некорректные значения пропускаются:
+    ошибки по ним вернет валидация конкретного рецепта """
+
+    ids = set()
+    for item in items:
+        values = item.get(field) if isinstance(item, dict) else None
+        if not isinstance(values, list):
+            continue
+        for value in values:
+            if key is not None:
+                value = value.get(key) if isinstance(value, dict) else None
+            try:
+                ids.add(int(value))
+            except (TypeError, ValueError):
+                pass
+    return ids
+
+
+class AddRecipeListSerializer(serializers.ListSerializer):
+    """ Пакетное добавление рецептов.
+
+    Теги, ингредиенты и названия проверяются одним запросом на весь
+    пакет, рецепты и их связи пишутся через bulk_create. """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self._context['existing_ids'] = {
+                Tag: existing_ids(Tag, collect_ids(data, 'tags')),
+                Ingredient: existing_ids(
+                    Ingredient, collect_ids(data, 'ingredients', 'id')
+                ),
+            }
+        return self.validate_names(super().to_internal_value(data))
+
+    def validate_names(self, attrs):
+        """ Ошибки возвращаются списком по рецептам, как и ошибки полей """
+
+        names = Counter(recipe['name'] for recipe in attrs)
+        taken = set(Recipe.objects.filter(
+            author=self.context.get('request').user, name__in=names
+        ).values_list('name', flat=True))
+        errors = [
+            {'name': ['Рецепт с таким названием уже есть']}
+            if recipe['name'] in taken or names[recipe['name']] > 1
+            else {}
+            for recipe in attrs
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    @atomic
+    def create(self, validated_data):
+        author = self.context.get('request').user
+        recipes = Recipe.objects.bulk_create(
+            Recipe(
+                author=author,
+                ingredients_count=len(data['ingredients_in_recipe']),
+                **{
+                    field: value for field, value in data.items()
+                    if field not in (
+                        'tags', 'ingredients_in_recipe', 'author'
+                    )
+                }
+            )
+            for data in validated_data
+        )
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag)
+            for recipe, data in zip(recipes, validated_data)
+            for tag in data['tags']
+        )
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe_id=recipe.pk,
+                ingredient_id=ingredient['id'],
+                amount=ingredient['amount'],
+            )
+            for recipe, data in zip(recipes, validated_data)
+            for ingredient in data['ingredients_in_recipe']
+        )
+        change_recipes_count(author.pk, len(recipes))
+        FeedEntry.objects.fan_out(recipe.pk for recipe in recipes)
+        invalidate('recipes')
+        images.schedule(recipe.pk for recipe in recipes)
+        return recipes
+
+    def to_representation(self, data):
+        recipes = Recipe.objects.with_related(
+            self.context.get('request').user
+        ).filter(pk__in=[recipe.pk for recipe in data])
+        return RecipeSerializer(recipes, many=True, context=self.context).data
+
+
 class AddRecipeSerializer(serializers.ModelSerializer):
     """ Сериализатор добавления/обновления рецепта """
 
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True
-    )
+    tags = serializers.ListField(child=serializers.IntegerField())
     ingredients = AddIngredientSerializer(
         many=True, source='ingredients_in_recipe'
     )
-    image = Base64ImageField()
+    image = RecipeImageField()
     author = serializers.PrimaryKeyRelatedField(
         read_only=True,
         default=serializers.CurrentUserDefault()
@@ -197,6 +343,7 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             'cooking_time', 'author'
         )
         model = Recipe
+        list_serializer_class = AddRecipeListSerializer
         validators = [
             UniqueTogetherValidator(
                 queryset=Recipe.objects.all(),
@@ -205,17 +352,33 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             )
         ]
 
+    def get_validators(self):
+        """ В пакете уникальность названий проверяет список целиком """
+
+        if isinstance(self.parent, serializers.ListSerializer):
+            return []
+        return super().get_validators()
+
+    def existing_ids(self, model, ids):
+        """ id из ids, которые есть в базе. В пакете они проверены
+        заранее одним запросом на все рецепты """
+
+        known = self.context.get('existing_ids', {}).get(model)
+        if known is None:
+            return existing_ids(model, ids)
+        return known
+
     def validate_ingredients(self, value):
         """ Проверка ингредиентов """
 
         ingredients = [ingredient.get('id') for ingredient in value]
         if not ingredients:
             raise serializers.ValidationError('Добавьте нгредиенты')
-        for id in ingredients:
-            if not Ingredient.objects.filter(pk=id).exists():
-                raise serializers.ValidationError(
-                    f'Ингредиентa с id {id} нет'
-                )
+        missing = set(ingredients) - self.existing_ids(Ingredient, ingredients)
+        if missing:
+            raise serializers.ValidationError(
+                f'Ингредиентa с id {min(missing)} нет'
+            )
         if len(set(ingredients)) != len(ingredients):
             raise serializers.ValidationError('Ингредиенты повторяются')
         if not all([0 if amount.get('amount') < 1 else 1 for amount in value]):
@@ -231,38 +394,81 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Теги не добавлены')
         if len(set(tags)) != len(tags):
             raise serializers.ValidationError('Теги повторяются')
+        missing = set(tags) - self.existing_ids(Tag, tags)
+        if missing:
+            raise serializers.ValidationError(f'Тега с id {min(missing)} нет')
 
         return value
 
     @staticmethod
     def save_ingredient_amount(ingredients, recipe):
-        ingredient_objs = []
-        for ingredient in ingredients:
-            current_ingredient = get_object_or_404(
-                Ingredient, id=ingredient.get('id')
-            )
-            ingredient_objs.append(IngredientAmount(
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
                 recipe=recipe,
-                ingredient=current_ingredient,
+                ingredient_id=ingredient.get('id'),
                 amount=ingredient.get('amount')
-            ))
-        IngredientAmount.objects.bulk_create(ingredient_objs)
+            )
+            for ingredient in ingredients
+        )
 
     @atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients_in_recipe')
         tags = validated_data.pop('tags')
         validated_data['author'] = self.context.get('request').user
+        validated_data['ingredients_count'] = len(ingredients)
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
         self.save_ingredient_amount(ingredients, recipe)
 
         return recipe
 
+    @staticmethod
+    def update_ingredient_amounts(recipe, ingredients):
+        """ Пишет только отличия от текущего состава: неизмененные строки
+        сохраняют id, списки покупок получают ту же разницу """
+
+        current = {
+            row.ingredient_id: row
+            for row in IngredientAmount.objects.filter(recipe=recipe)
+        }
+        amounts = {
+            ingredient.get('id'): ingredient.get('amount')
+            for ingredient in ingredients
+        }
+        deltas = amount_deltas(
+            {
+                ingredient_id: row.amount
+                for ingredient_id, row in current.items()
+            },
+            amounts
+        )
+        removed = [
+            row.pk for ingredient_id, row in current.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        for ingredient_id, row in current.items():
+            if deltas.get(ingredient_id) and ingredient_id in amounts:
+                row.amount = amounts[ingredient_id]
+                changed.append(row)
+        if removed:
+            IngredientAmount.objects.filter(pk__in=removed).delete()
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ('amount',))
+        AddRecipeSerializer.save_ingredient_amount(
+            [
+                ingredient for ingredient in ingredients
+                if ingredient.get('id') not in current
+            ],
+            recipe
+        )
+        ShoppingListItem.objects.apply_to_carts(recipe.pk, deltas)
+
     @atomic
     def update(self, instance, validated_data):
-        ingredients = validated_data.pop('ingredients_in_recipe')
-        tags = validated_data.pop('tags')
+        ingredients = validated_data.pop('ingredients_in_recipe', None)
+        tags = validated_data.pop('tags', None)
 
         for key in validated_data:
             if not validated_data[key]:
@@ -271,19 +477,26 @@ class AddRecipeSerializer(serializers.ModelSerializer):
         if tags:
             instance.tags.set(tags)
         if ingredients:
-            instance.ingredients.clear()
-            self.save_ingredient_amount(ingredients, instance)
+            self.update_ingredient_amounts(instance, ingredients)
+            Recipe.objects.count_ingredients(pk=instance.pk)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        instance = Recipe.objects.with_related(
+            self.context.get('request').user
+        ).get(pk=instance.pk)
         return RecipeSerializer(instance, context=self.context).data
 
 
-class SmallRecipeSerializer(serializers.ModelSerializer):
+class SmallRecipeSerializer(TimedSerializerMixin,
+                            serializers.ModelSerializer):
     """ Кратное отображение рецепта """
+
+    images = ImageRenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
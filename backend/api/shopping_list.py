@@ -0,0 +1,72 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+PDF_FONT = 'ShoppingListFont'
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 18
+CHUNK_SIZE = 64 * 1024
+
+
+def text_lines(rows):
+    for index, (name, unit, amount) in enumerate(rows, 1):
+        yield f'{index}. {name}({unit}) — {amount}\n'
+
+
+class _Echo:
+    """ Буфер для csv.writer, возвращающий записанную строку """
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _pdf_font():
+    if PDF_FONT in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT
+    if not os.path.exists(settings.SHOPPING_LIST_PDF_FONT):
+        return 'Helvetica'
+    pdfmetrics.registerFont(TTFont(PDF_FONT, settings.SHOPPING_LIST_PDF_FONT))
+    return PDF_FONT
+
+
+def pdf_chunks(rows):
+    """ PDF нельзя дописывать построчно, поэтому документ собирается
+    в памяти и отдается частями. """
+
+    buffer = io.BytesIO()
+    document = canvas.Canvas(buffer, pagesize=A4)
+    font = _pdf_font()
+    width, height = A4
+    top = height - PDF_MARGIN
+    y = top
+    document.setFont(font, 12)
+    for line in text_lines(rows):
+        if y < PDF_MARGIN:
+            document.showPage()
+            document.setFont(font, 12)
+            y = top
+        document.drawString(PDF_MARGIN, y, line.rstrip())
+        y -= PDF_LINE_HEIGHT
+    document.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(CHUNK_SIZE), b'')
+
+
+SHOPPING_LIST_FORMATS = {
+    'txt': text_lines,
+    'csv': csv_lines,
+    'pdf': pdf_chunks,
+}
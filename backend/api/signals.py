@@ -0,0 +1,82 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.core.cache import cache
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import (
+    SNAPSHOT_FIELDS, invalidate_user, token_cache_key
+)
+from api.cache import invalidate
+from api.catalog import ingredient_catalog, tag_snapshot
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+
+User = get_user_model()
+
+AUTHOR_FIELDS = frozenset(
+    ('email', 'username', 'first_name', 'last_name')
+)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_catalog(**kwargs):
+    ingredient_catalog.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tag_snapshot(**kwargs):
+    tag_snapshot.invalidate()
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_recipes(**kwargs):
+    """ Теги рецепта API меняет только вместе с сохранением рецепта,
+    отдельный сигнал на них лишил бы удаление и set() быстрых путей """
+
+    invalidate('recipes')
+
+
+@receiver((post_save, post_delete), sender=IngredientAmount)
+def invalidate_amount_recipes(origin=None, **kwargs):
+    """ Строки состава по одной меняются в админке и из кода. Каскад
+    сбрасывает удаляемый рецепт или ингредиент, пакетную запись API —
+    сохранение рецепта """
+
+    if origin is None or isinstance(origin, IngredientAmount):
+        invalidate('recipes')
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(created, update_fields=None, **kwargs):
+    """ Автор входит в ответ рецепта, вход в систему и регистрация
+    рецепты не меняют """
+
+    if created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    invalidate_recipes()
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(instance, **kwargs):
+    """ Выход через djoser удаляет токен """
+
+    cache.delete(token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_snapshots(instance, created=False, update_fields=None,
+                              **kwargs):
+    """ Смена пароля, блокировка и правка данных пользователя """
+
+    if created:
+        return
+    if update_fields is not None and not (
+        {*SNAPSHOT_FIELDS, 'password'} & set(update_fields)
+    ):
+        return
+    invalidate_user(instance.pk)
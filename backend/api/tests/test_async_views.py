@@ -0,0 +1,128 @@
+import json
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import AsyncClient, TransactionTestCase, override_settings
+from django.urls import include, path
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+
+from api.async_views import async_read_urls
+from api.performance import PerformanceMiddleware
+from api.urls import router_v1
+from api.views import (
+    CustomUserViewSet, IngredientViewSet, RecipeViewSet, TagViewSet
+)
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+
+User = get_user_model()
+
+urlpatterns = [
+    path('api/', include((async_read_urls(router_v1.urls, (
+        CustomUserViewSet, IngredientViewSet, RecipeViewSet, TagViewSet
+    )), 'api'))),
+]
+
+
+@override_settings(
+    ROOT_URLCONF=__name__, ASYNC_READ_WORKERS=2, RECIPE_IMAGE_WORKERS=0
+)
+class AsyncReadViewTest(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            username='cook', email='cook@foodgram.ru'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.tag = Tag.objects.create(
+            name='Завтрак', color='#FFAA00', slug='breakfast'
+        )
+        self.recipe = Recipe.objects.create(
+            name='Омлет', author=self.user, image='recipe_images/test.png',
+            text='Описание', cooking_time=10
+        )
+        self.client = AsyncClient()
+        self.headers = {'AUTHORIZATION': f'Token {self.token.key}'}
+
+    def get(self, url):
+        return async_to_sync(self.client.get)(url, **self.headers)
+
+    def test_reads_run_in_pool(self):
+        response = self.get('/api/recipes/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.json()['results'][0]['id'], self.recipe.id
+        )
+        self.assertEqual(
+            self.get('/api/tags/').json()[0]['slug'], 'breakfast'
+        )
+        self.assertEqual(
+            self.get(f'/api/recipes/{self.recipe.id}/').json()['name'],
+            'Омлет'
+        )
+        self.assertEqual(
+            self.get('/api/users/subscriptions/').status_code,
+            status.HTTP_200_OK
+        )
+
+    def test_writes_are_delegated(self):
+        response = async_to_sync(self.client.post)(
+            f'/api/recipes/{self.recipe.id}/favorite/', **self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(
+            self.get(f'/api/recipes/{self.recipe.id}/').json()[
+                'is_favorited'
+            ]
+        )
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1.0)
+    def test_metrics_cover_pool_threads(self):
+        self.client = AsyncClient()
+        with self.assertLogs('api.performance', 'INFO') as logs:
+            response = self.get('/api/recipes/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'recipes.list')
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['render_ms'], 0)
+        self.assertIn('Server-Timing', response)
+        with self.assertLogs('api.performance', 'INFO') as logs:
+            response = async_to_sync(self.client.post)(
+                f'/api/recipes/{self.recipe.id}/favorite/', **self.headers
+            )
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'recipes.favorite')
+        self.assertGreater(record['queries'], 0)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1.0)
+    def test_middleware_runs_async(self):
+        async def get_response(request):
+            return None
+
+        self.assertTrue(
+            iscoroutinefunction(PerformanceMiddleware(get_response))
+        )
+        self.assertFalse(
+            iscoroutinefunction(PerformanceMiddleware(lambda request: None))
+        )
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_streaming_response_is_spooled(self):
+        IngredientAmount.objects.create(
+            recipe=self.recipe, amount=3, ingredient=Ingredient.objects.create(
+                name='Яйца', measurement_unit='шт'
+            )
+        )
+        async_to_sync(self.client.post)(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/', **self.headers
+        )
+        with patch('api.async_views.SPOOL_MAX_SIZE', 1):
+            response = self.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            b''.join(response.streaming_content).decode(), '1. Яйца(шт) — 3\n'
+        )
@@ -0,0 +1,92 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.checks import check_shared_cache
+
+User = get_user_model()
+
+ME_URL = '/api/users/me/'
+TAGS_URL = '/api/tags/'
+
+
+@override_settings(SHARED_CACHE=True)
+class CachedTokenAuthenticationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='cook', email='cook@foodgram.ru', password='old-pass-123'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def assertTagsStatus(self, expected_status, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(TAGS_URL)
+        self.assertEqual(response.status_code, expected_status)
+
+    def test_repeated_requests_skip_token_query(self):
+        self.assertTagsStatus(status.HTTP_200_OK, 2)
+        self.assertTagsStatus(status.HTTP_200_OK, 0)
+
+    @override_settings(SHARED_CACHE=False)
+    def test_process_local_cache_checks_token(self):
+        self.assertTagsStatus(status.HTTP_200_OK, 2)
+        self.assertTagsStatus(status.HTTP_200_OK, 1)
+
+    def test_logout_invalidates(self):
+        self.assertTagsStatus(status.HTTP_200_OK, 2)
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTagsStatus(status.HTTP_401_UNAUTHORIZED, 1)
+
+    def test_deactivation_invalidates(self):
+        self.assertTagsStatus(status.HTTP_200_OK, 2)
+        self.user.is_active = False
+        self.user.save(update_fields=('is_active',))
+        self.assertTagsStatus(status.HTTP_401_UNAUTHORIZED, 1)
+
+    def test_password_change_invalidates(self):
+        self.assertTagsStatus(status.HTTP_200_OK, 2)
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'old-pass-123',
+            'new_password': 'new-pass-456',
+        })
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('new-pass-456'))
+        self.assertTagsStatus(status.HTTP_200_OK, 1)
+
+    def test_cached_user_save_keeps_counters(self):
+        self.client.get(TAGS_URL)
+        User.objects.filter(pk=self.user.pk).update(recipes_count=5)
+        self.client.post('/api/users/set_password/', {
+            'current_password': 'old-pass-123',
+            'new_password': 'new-pass-456',
+        })
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 5)
+        self.assertEqual(
+            self.client.get(ME_URL).data['recipes_count'], 5
+        )
+
+
+class SharedCacheCheckTest(TestCase):
+
+    @override_settings(SHARED_CACHE=False, DATABASE_REPLICAS=['replica'])
+    def test_process_local_cache_fails_check(self):
+        self.assertEqual(
+            [error.id for error in check_shared_cache(None)], ['api.E002']
+        )
+
+    @override_settings(SHARED_CACHE=True, DATABASE_REPLICAS=['replica'])
+    def test_shared_cache_passes_check(self):
+        self.assertEqual(check_shared_cache(None), [])
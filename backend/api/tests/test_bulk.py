@@ -0,0 +1,59 @@
+from rest_framework import status
+
+from api.tests.test_query_counts import QueryBudgetTestCase
+from recipes.models import IngredientAmount, Recipe
+
+URL = '/api/recipes/bulk/'
+
+
+class BulkCreateTest(QueryBudgetTestCase):
+
+    def batch(self, size):
+        return [self.recipe_data(f'Пакетный рецепт {index}')
+                for index in range(size)]
+
+    def test_budget_does_not_depend_on_batch_size(self):
+        for size in (2, 20):
+            self.assertBudget(
+                14, self.auth_client, 'post', URL,
+                [{**recipe, 'name': f'{recipe["name"]} из {size}'}
+                 for recipe in self.batch(size)],
+                expected_status=status.HTTP_201_CREATED
+            )
+
+    def test_create(self):
+        self.user.refresh_from_db()
+        recipes_count = self.user.recipes_count
+        response = self.auth_client.post(URL, self.batch(3), format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 3)
+        created = Recipe.objects.filter(name__startswith='Пакетный')
+        self.assertEqual(created.count(), 3)
+        self.assertEqual(
+            IngredientAmount.objects.filter(recipe__in=created).count(),
+            3 * len(self.recipe_data('')['ingredients'])
+        )
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, recipes_count + 3)
+
+    def test_errors_are_reported_per_recipe(self):
+        batch = self.batch(3)
+        batch[0]['tags'] = [0]
+        batch[1]['ingredients'][0]['id'] = 0
+        batch[2]['name'] = self.own_recipe.name
+        response = self.auth_client.post(URL, batch, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tags', response.data[0])
+        self.assertIn('ingredients', response.data[1])
+        self.assertFalse(
+            Recipe.objects.filter(name__startswith='Пакетный').exists()
+        )
+        batch = self.batch(2)
+        batch[1]['name'] = batch[0]['name']
+        response = self.auth_client.post(URL, batch, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('name', response.data[1])
+
+    def test_guest_forbidden(self):
+        response = self.guest_client.post(URL, self.batch(1), format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
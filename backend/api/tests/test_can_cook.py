@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+
+User = get_user_model()
+
+
+class CanCookFilterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='cook', email='cook@foodgram.ru'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#FFAA00', slug='breakfast'
+        )
+        cls.eggs, cls.milk, cls.flour, cls.sugar = (
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('Яйца', 'Молоко', 'Мука', 'Сахар')
+        )
+        cls.omelette = cls.create_recipe('Омлет', cls.eggs, cls.milk)
+        cls.pancakes = cls.create_recipe(
+            'Блины', cls.eggs, cls.milk, cls.flour
+        )
+        cls.cake = cls.create_recipe(
+            'Бисквит', cls.eggs, cls.flour, cls.sugar
+        )
+        cls.omelette.tags.add(cls.tag)
+
+    @classmethod
+    def create_recipe(cls, name, *ingredients):
+        recipe = Recipe.objects.create(
+            name=name, author=cls.user, image='recipe_images/test.png',
+            text='Описание', cooking_time=10,
+            ingredients_count=len(ingredients)
+        )
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients
+        )
+        return recipe
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def can_cook(self, *ingredients, **params):
+        response = self.client.get('/api/recipes/', {
+            'ingredients': ','.join(str(item.id) for item in ingredients),
+            **params
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_all_ingredients_available(self):
+        self.assertEqual(
+            self.can_cook(self.eggs, self.milk, self.sugar),
+            [self.omelette.id]
+        )
+
+    def test_ranked_by_missing_then_coverage(self):
+        self.assertEqual(
+            self.can_cook(self.eggs, self.milk, max_missing=1),
+            [self.omelette.id, self.pancakes.id]
+        )
+        self.assertEqual(
+            self.can_cook(self.eggs, self.flour, max_missing=1),
+            [self.cake.id, self.pancakes.id, self.omelette.id]
+        )
+
+    def test_combines_with_tags(self):
+        self.assertEqual(
+            self.can_cook(
+                self.eggs, self.milk, self.flour, tags='breakfast'
+            ),
+            [self.omelette.id]
+        )
+
+    def test_invalid_max_missing(self):
+        response = self.client.get(
+            '/api/recipes/', {'ingredients': self.eggs.id, 'max_missing': -1}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_counter_follows_recipe_changes(self):
+        self.client.patch(
+            f'/api/recipes/{self.cake.id}/',
+            {'ingredients': [{'id': self.eggs.id, 'amount': 2}]},
+            format='json'
+        )
+        self.cake.refresh_from_db()
+        self.assertEqual(self.cake.ingredients_count, 1)
+        self.sugar.delete()
+        self.cake.refresh_from_db()
+        self.assertEqual(self.cake.ingredients_count, 1)
+        self.flour.delete()
+        self.pancakes.refresh_from_db()
+        self.assertEqual(self.pancakes.ingredients_count, 2)
+
+    def test_counter_follows_direct_amount_changes(self):
+        amount = IngredientAmount.objects.create(
+            recipe=self.omelette, ingredient=self.sugar, amount=1
+        )
+        self.omelette.refresh_from_db()
+        self.assertEqual(self.omelette.ingredients_count, 3)
+        amount.recipe = self.pancakes
+        amount.save()
+        self.omelette.refresh_from_db()
+        self.pancakes.refresh_from_db()
+        self.assertEqual(self.omelette.ingredients_count, 2)
+        self.assertEqual(self.pancakes.ingredients_count, 4)
+        amount.delete()
+        self.pancakes.refresh_from_db()
+        self.assertEqual(self.pancakes.ingredients_count, 3)
@@ -0,0 +1,107 @@
+from time import sleep
+
+from django.core.cache import cache
+
+from api.tests.test_query_counts import PAGE_SIZE, QueryBudgetTestCase
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+class ConditionalRequestTest(QueryBudgetTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/recipes/{self.free_recipe.id}/'
+
+    def test_detail_not_modified_with_cheap_check(self):
+        etag = self.auth_client.get(self.url)['ETag']
+        response = self.assertBudget(
+            1, self.auth_client, 'get', self.url,
+            expected_status=304, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response['ETag'], etag)
+
+    def test_guest_validators_follow_counters(self):
+        response = self.guest_client.get(self.url)
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        cache.clear()
+        self.assertBudget(
+            1, self.guest_client, 'get', self.url, expected_status=304,
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertBudget(
+            1, self.guest_client, 'get', self.url, expected_status=304,
+            HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        sleep(1)
+        self.auth_client.post(f'{self.url}favorite/')
+        cache.clear()
+        response = self.guest_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.guest_client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_flags_change_etag(self):
+        etag = self.auth_client.get(self.url)['ETag']
+        Favorite.objects.create(user=self.user, recipe=self.free_recipe)
+        response = self.auth_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_tag_edit_touches_recipe(self):
+        updated_at = self.free_recipe.updated_at
+        tag = self.tags[0]
+        tag.name = 'Переименованный'
+        tag.save()
+        self.free_recipe.refresh_from_db()
+        self.assertGreater(self.free_recipe.updated_at, updated_at)
+
+    def test_amount_edit_touches_recipe(self):
+        etag = self.guest_client.get(self.url)['ETag']
+        amount = self.free_recipe.ingredients_in_recipe.first()
+        amount.amount += 1
+        amount.save()
+        cache.clear()
+        response = self.guest_client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.free_recipe.refresh_from_db()
+        updated_at = self.free_recipe.updated_at
+        amount.delete()
+        self.free_recipe.refresh_from_db()
+        self.assertGreater(self.free_recipe.updated_at, updated_at)
+
+    def test_list_validators_follow_user_cart(self):
+        url = f'/api/recipes/?limit={PAGE_SIZE}'
+        response = self.auth_client.get(url)
+        self.assertNotIn('Last-Modified', response)
+        etag = response['ETag']
+        self.assertBudget(
+            1, self.auth_client, 'get', url, expected_status=304,
+            HTTP_IF_NONE_MATCH=etag
+        )
+        ShoppingCart.objects.create(user=self.user, recipe=self.free_recipe)
+        response = self.auth_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_guest_list_modified_after_delete(self):
+        url = f'/api/recipes/?limit={PAGE_SIZE}'
+        last_modified = self.guest_client.get(url)['Last-Modified']
+        sleep(1)
+        Recipe.objects.filter(pk=self.free_recipe.pk).delete()
+        response = self.guest_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_guest_list_not_modified_from_cache(self):
+        url = f'/api/recipes/?limit={PAGE_SIZE}'
+        etag = self.guest_client.get(url)['ETag']
+        response = self.assertBudget(
+            0, self.guest_client, 'get', url, expected_status=304,
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response['ETag'], etag)
+        Recipe.objects.filter(pk=self.free_recipe.pk).delete()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(
+            username='author', email='author@foodgram.ru'
+        )
+        cls.reader = User.objects.create(
+            username='reader', email='reader@foodgram.ru'
+        )
+        cls.recipe = Recipe.objects.create(
+            name='Пирог', author=cls.author, image='recipe_images/test.png',
+            text='Описание', cooking_time=10
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def assertCounters(self, favorites, recipes, followers, following):
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.reader.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, favorites)
+        self.assertEqual(self.author.recipes_count, recipes)
+        self.assertEqual(self.author.followers_count, followers)
+        self.assertEqual(self.reader.following_count, following)
+
+    def test_counters_follow_writes(self):
+        self.assertCounters(0, 1, 0, 0)
+        self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        response = self.client.post(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+        self.assertEqual(response.data['followers_count'], 1)
+        self.assertCounters(1, 1, 1, 1)
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.data['favorites_count'], 1)
+        self.client.delete(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.client.delete(f'/api/users/{self.author.id}/subscribe/')
+        self.assertCounters(0, 1, 0, 0)
+        self.recipe.delete()
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 0)
+
+    def test_reconcile(self):
+        Favorite.objects.bulk_create([
+            Favorite(user=self.reader, recipe=self.recipe)
+        ])
+        with self.assertRaises(CommandError):
+            call_command('reconcile_counters', '--check', stdout=StringIO())
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(1, 1, 0, 0)
+        call_command('reconcile_counters', '--check', stdout=StringIO())
+
+    def test_save_keeps_counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        recipe.name = 'Пирог с вишней'
+        recipe.save()
+        self.assertCounters(1, 1, 0, 0)
+        self.assertEqual(self.recipe.name, 'Пирог с вишней')
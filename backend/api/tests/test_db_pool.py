@@ -0,0 +1,62 @@
+from threading import Thread
+
+from django.test import SimpleTestCase
+
+from foodgram_backend.db.pool import (
+    ConnectionMetrics, ConnectionPool, PoolTimeout
+)
+
+
+class FakeConnection:
+    closed = 0
+
+    def close(self):
+        self.closed = 1
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def setUp(self):
+        self.metrics = ConnectionMetrics()
+        self.pool = ConnectionPool(
+            FakeConnection, size=2, timeout=0.05, metrics=self.metrics
+        )
+
+    def test_released_connection_is_reused(self):
+        connection = self.pool.acquire()
+        self.pool.release(connection)
+        self.assertIs(self.pool.acquire(), connection)
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot['connect']['count'], 1)
+        self.assertEqual(snapshot['wait']['count'], 2)
+
+    def test_waits_for_free_connection(self):
+        self.pool.timeout = 5
+        first, second = self.pool.acquire(), self.pool.acquire()
+        acquired = []
+        waiter = Thread(target=lambda: acquired.append(self.pool.acquire()))
+        waiter.start()
+        self.pool.release(first)
+        waiter.join()
+        self.assertEqual(acquired, [first])
+        self.pool.release(second)
+
+    def test_timeout_when_exhausted(self):
+        self.pool.acquire()
+        self.pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            self.pool.acquire()
+        self.assertEqual(self.metrics.snapshot()['timeouts'], 1)
+
+    def test_failed_check_discards_connection(self):
+        connection = self.pool.acquire()
+        self.pool.release(connection)
+        fresh = self.pool.acquire(check=lambda connection: False)
+        self.assertIsNot(fresh, connection)
+        self.assertTrue(connection.closed)
+        self.assertEqual(self.metrics.snapshot()['discarded'], 1)
+
+    def test_broken_connection_frees_slot(self):
+        for _ in range(3):
+            self.pool.release(self.pool.acquire(), reusable=False)
+        self.assertEqual(self.metrics.snapshot()['connect']['count'], 3)
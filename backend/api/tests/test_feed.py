@@ -0,0 +1,127 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+FEED_URL = '/api/recipes/feed/'
+
+
+class FeedTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author, cls.other = (
+            User.objects.create(username=name, email=f'{name}@foodgram.ru')
+            for name in ('reader', 'author', 'other')
+        )
+        cls.token = Token.objects.create(user=cls.reader)
+        Subscription.objects.create(user=cls.reader, author=cls.author)
+        cls.recipes = [
+            cls.create_recipe(cls.author if index % 2 else cls.other, index)
+            for index in range(8)
+        ]
+
+    @classmethod
+    def create_recipe(cls, author, index):
+        recipe = Recipe.objects.create(
+            name=f'Рецепт{index}', author=author,
+            image='recipe_images/test.png', text='Описание',
+            cooking_time=10
+        )
+        pub_date = recipe.pub_date + timedelta(minutes=index)
+        Recipe.objects.filter(pk=recipe.pk).update(pub_date=pub_date)
+        FeedEntry.objects.filter(recipe=recipe).update(pub_date=pub_date)
+        return recipe
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def feed_ids(self, url=FEED_URL):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def expected(self, author):
+        return [
+            recipe.id for recipe in reversed(self.recipes)
+            if recipe.author == author
+        ]
+
+    def test_new_recipes_are_fanned_out(self):
+        self.assertEqual(self.feed_ids(), self.expected(self.author))
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 4
+        )
+
+    def test_cursor_pagination(self):
+        response = self.client.get(f'{FEED_URL}?limit=3')
+        self.assertEqual(len(response.data['results']), 3)
+        rest = self.feed_ids(response.data['next'])
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']] + rest,
+            self.expected(self.author)
+        )
+
+    @override_settings(FEED_BACKFILL_SIZE=2)
+    def test_subscribe_backfills_and_unsubscribe_clears(self):
+        url = f'/api/users/{self.other.id}/subscribe/'
+        self.client.post(url)
+        self.assertEqual(
+            self.feed_ids(),
+            sorted(
+                self.expected(self.author) + self.expected(self.other)[:2],
+                reverse=True
+            )
+        )
+        self.client.delete(url)
+        self.assertEqual(self.feed_ids(), self.expected(self.author))
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_authors_are_read_directly(self):
+        FeedEntry.objects.rebuild()
+        recipe = self.create_recipe(self.author, 8)
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+        self.assertEqual(self.feed_ids()[0], recipe.id)
+        self.assertEqual(len(self.feed_ids()), 5)
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_cursor_merges_direct_authors(self):
+        Subscription.objects.create(user=self.reader, author=self.other)
+        ids, url = [], f'{FEED_URL}?limit=3'
+        while url:
+            response = self.client.get(url)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, [recipe.id for recipe in reversed(self.recipes)])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_crossing_limit_stays_direct(self):
+        Subscription.objects.create(user=self.other, author=self.author)
+        self.assertFalse(
+            FeedEntry.objects.filter(recipe__author=self.author).exists()
+        )
+        self.assertEqual(self.feed_ids(), self.expected(self.author))
+        Subscription.objects.filter(user=self.other).delete()
+        self.assertEqual(self.feed_ids(), self.expected(self.author))
+        recipe = self.create_recipe(self.author, 8)
+        self.assertEqual(self.feed_ids()[0], recipe.id)
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+
+    def test_rebuild(self):
+        FeedEntry.objects.rebuild()
+        self.assertEqual(self.feed_ids(), self.expected(self.author))
+
+    def test_requires_authentication(self):
+        self.assertEqual(
+            APIClient().get(FEED_URL).status_code,
+            status.HTTP_401_UNAUTHORIZED
+        )
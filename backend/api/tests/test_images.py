@@ -0,0 +1,57 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework import status
+
+from api.tests.test_query_counts import QueryBudgetTestCase
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+@override_settings(RECIPE_IMAGE_SIZES={'thumbnail': (8, 8), 'card': (16, 16)})
+class ImageRenditionsTest(QueryBudgetTestCase):
+
+    def create(self):
+        response = self.auth_client.post(
+            '/api/recipes/', self.recipe_data('С картинкой'), format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['images'], {})
+        return Recipe.objects.get(pk=response.data['id'])
+
+    def test_renditions(self):
+        recipe = self.create()
+        self.assertTrue(process_recipe_image(recipe.id))
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.renditions['source'], recipe.image.name)
+        for size in ('thumbnail', 'card'):
+            files = recipe.renditions[size]
+            self.assertEqual(set(files), {'webp', 'jpeg'})
+            for name in files.values():
+                self.assertTrue(recipe.image.storage.exists(name))
+        images = self.guest_client.get(
+            f'/api/recipes/{recipe.id}/'
+        ).data['images']
+        self.assertEqual(set(images), {'thumbnail', 'card'})
+        self.assertTrue(
+            images['card']['webp'].startswith('http://testserver/')
+        )
+
+    def test_new_image_hides_old_renditions(self):
+        recipe = self.create()
+        process_recipe_image(recipe.id)
+        response = self.auth_client.patch(
+            f'/api/recipes/{recipe.id}/', self.recipe_data(recipe.name),
+            format='json'
+        )
+        self.assertEqual(response.data['images'], {})
+
+    def test_command(self):
+        recipe = self.create()
+        call_command(
+            'process_recipe_images', recipe.id, stdout=StringIO()
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.renditions['source'], recipe.image.name)
+        self.assertIn('card', recipe.renditions)
@@ -0,0 +1,54 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.catalog import ingredient_catalog
+from recipes.models import Ingredient
+
+NAMES = ('сахарная пудра', 'ванильный сахар', 'сахар', 'соль', 'сахарин')
+
+
+class IngredientSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=name, measurement_unit='г') for name in NAMES
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        ingredient_catalog.invalidate()
+
+    def search(self, query):
+        response = self.client.get('/api/ingredients/', {'name': query})
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix_matches_first(self):
+        expected = ['сахар', 'сахарин', 'сахарная пудра', 'ванильный сахар']
+        self.assertEqual(self.search('сахар'), expected)
+        with override_settings(INGREDIENT_SEARCH_CACHE=True):
+            self.assertEqual(self.search('сахар'), expected)
+
+    @override_settings(INGREDIENT_SEARCH_LIMIT=2)
+    def test_limit(self):
+        self.assertEqual(self.search('сахар'), ['сахар', 'сахарин'])
+        with override_settings(INGREDIENT_SEARCH_CACHE=True):
+            self.assertEqual(self.search('сахар'), ['сахар', 'сахарин'])
+
+    @override_settings(INGREDIENT_SEARCH_CACHE=True)
+    def test_cache_served_without_queries(self):
+        self.search('са')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('СОЛ'), ['соль'])
+        Ingredient.objects.create(name='солод', measurement_unit='г')
+        self.assertEqual(self.search('сол'), ['солод', 'соль'])
+
+    def test_search_keeps_queryset(self):
+        queryset = Ingredient.objects.exclude(name='сахар')
+        self.assertEqual(
+            [
+                ingredient.name for ingredient in
+                Ingredient.objects.search('сахар', queryset=queryset)
+            ],
+            ['сахарин', 'сахарная пудра', 'ванильный сахар']
+        )
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.paginators import KeysetPaginator
+from recipes.models import Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class KeysetPaginationTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='reader', email='reader@foodgram.ru'
+        )
+        recipes = [
+            Recipe.objects.create(
+                name=f'Рецепт{index}', author=cls.user,
+                image='recipe_images/test.png', text='Описание',
+                cooking_time=10
+            )
+            for index in range(13)
+        ]
+        published = recipes[0].pub_date
+        for index, recipe in enumerate(recipes):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=published - timedelta(days=index // 3)
+            )
+        for index in range(7):
+            author = User.objects.create(
+                username=f'author{index}', email=f'author{index}@foodgram.ru',
+                last_name='Однофамилец'
+            )
+            Subscription.objects.create(user=cls.user, author=author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_recipes_match_page_numbers(self):
+        expected = [
+            recipe['id'] for recipe in
+            self.client.get('/api/recipes/?limit=100').data['results']
+        ]
+        self.assertEqual(len(expected), 13)
+        self.assertEqual(self.walk('/api/recipes/?limit=4&cursor='), expected)
+
+    def test_subscriptions(self):
+        expected = [
+            author['id'] for author in self.client.get(
+                '/api/users/subscriptions/?limit=100'
+            ).data['results']
+        ]
+        self.assertEqual(len(expected), 7)
+        self.assertEqual(
+            self.walk('/api/users/subscriptions/?limit=3&cursor='), expected
+        )
+
+    def test_leading_bound(self):
+        paginator = KeysetPaginator()
+        paginator.ordering = ('last_name', 'first_name', 'id')
+        condition = paginator.after(['Однофамилец', '', 1])
+        self.assertEqual(condition.connector, Q.AND)
+        self.assertIn(('last_name__gte', 'Однофамилец'), condition.children)
+
+    def test_ranked_ordering_rejects_cursor(self):
+        for query in ('search=Рецепт', 'ingredients=1,2'):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/recipes/?{query}&cursor=')
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/?cursor=bad')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
@@ -0,0 +1,69 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+
+@override_settings(PERFORMANCE_SAMPLE_RATE=1.0)
+class PerformanceMiddlewareTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='cook', email='cook@foodgram.ru'
+        )
+        tag = Tag.objects.create(
+            name='Завтрак', color='#FFAA00', slug='breakfast'
+        )
+        for name in ('Омлет', 'Каша'):
+            recipe = Recipe.objects.create(
+                name=name, author=cls.user, image='recipe_images/test.png',
+                text='Описание', cooking_time=10
+            )
+            recipe.tags.add(tag)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, url):
+        with self.assertLogs('api.performance', 'INFO') as logs:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+        return response, json.loads(logs.records[0].getMessage()), queries
+
+    def test_metrics_are_reported(self):
+        response, record, queries = self.get('/api/recipes/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(record['view'], 'recipes.list')
+        self.assertEqual(record['status'], status.HTTP_200_OK)
+        self.assertEqual(record['queries'], len(queries))
+        self.assertGreater(record['serialize_ms'], 0)
+        timing = response['Server-Timing']
+        for metric in ('total;dur=', 'db;dur=', 'serialize;dur=',
+                       'render;dur=', 'view;desc="recipes.list"'):
+            self.assertIn(metric, timing)
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+
+    def test_action_tag(self):
+        self.client.force_authenticate(self.user)
+        response, record, queries = self.get(
+            '/api/recipes/download_shopping_cart/'
+        )
+        self.assertEqual(record['view'], 'recipes.download_shopping_cart')
+        response, record, queries = self.get(f'/api/users/{self.user.id}/')
+        self.assertEqual(record['view'], 'users.retrieve')
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_disabled_by_default(self):
+        response = self.client.get('/api/tags/')
+        self.assertNotIn('Server-Timing', response)
@@ -0,0 +1,341 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Favorite, FeedEntry, Ingredient, IngredientAmount, Recipe,
+    ShoppingCart, ShoppingListItem, Tag
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAA'
+    'DElEQVR4nGP4z8AAAAMBAQDJ/pLvAAAAAElFTkSuQmCC'
+)
+
+USERS = 12
+TAGS = 3
+INGREDIENTS = 30
+RECIPES = 60
+INGREDIENTS_PER_RECIPE = 8
+PAGE_SIZE = 50
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, SHARED_CACHE=True)
+class QueryBudgetTestCase(TestCase):
+    """ Бюджет SQL-запросов на каждый эндпоинт API.
+
+    Данных в базе больше, чем помещается на страницу, поэтому запрос на
+    строку сериализатора сразу выходит за бюджет. """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = User.objects.bulk_create(
+            User(
+                username=f'user{index}',
+                email=f'user{index}@foodgram.ru',
+                first_name=f'Имя{index}',
+                last_name=f'Фамилия{index}',
+            )
+            for index in range(USERS)
+        )
+        cls.user = cls.users[0]
+        cls.token = Token.objects.create(user=cls.user)
+        cls.tags = Tag.objects.bulk_create(
+            Tag(name=f'Тег{index}', color=f'#0000{index:02}',
+                slug=f'tag{index}')
+            for index in range(TAGS)
+        )
+        cls.ingredients = Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент{index}', measurement_unit='г')
+            for index in range(INGREDIENTS)
+        )
+        cls.recipes = []
+        for index in range(RECIPES):
+            recipe = Recipe.objects.create(
+                name=f'Рецепт{index}',
+                author=cls.users[index % USERS],
+                image='recipe_images/test.png',
+                text='Описание',
+                cooking_time=10,
+            )
+            recipe.tags.set(cls.tags)
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(
+                    recipe=recipe,
+                    ingredient=cls.ingredients[
+                        (index + offset) % INGREDIENTS
+                    ],
+                    amount=offset + 1,
+                )
+                for offset in range(INGREDIENTS_PER_RECIPE)
+            )
+            cls.recipes.append(recipe)
+        own_recipes = [
+            recipe for recipe in cls.recipes if recipe.author == cls.user
+        ]
+        foreign_recipes = [
+            recipe for recipe in cls.recipes if recipe.author != cls.user
+        ]
+        Favorite.objects.bulk_create(
+            Favorite(user=cls.user, recipe=recipe)
+            for recipe in foreign_recipes[::2]
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in foreign_recipes[::3]
+        )
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.user, author=author)
+            for author in cls.users[1:-1]
+        )
+        ShoppingListItem.objects.rebuild()
+        FeedEntry.objects.rebuild()
+        call_command('reconcile_counters', stdout=StringIO())
+        cls.own_recipe = own_recipes[0]
+        cls.free_recipe = foreign_recipes[1]
+        cls.unfollowed = cls.users[-1]
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = APIClient()
+        self.auth_client = APIClient()
+        self.auth_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.auth_client.get('/api/users/me/')
+
+    def recipe_data(self, name):
+        return {
+            'name': name,
+            'text': 'Описание',
+            'cooking_time': 15,
+            'image': IMAGE,
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in self.ingredients[:INGREDIENTS_PER_RECIPE]
+            ],
+        }
+
+    def assertBudget(self, budget, client, method, url, data=None,
+                     expected_status=status.HTTP_200_OK, **extra):
+        with self.assertNumQueries(budget):
+            response = getattr(client, method)(
+                url, data, format='json', **extra
+            )
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, expected_status)
+        return response
+
+
+class ReferenceDataQueryTest(QueryBudgetTestCase):
+
+    def test_tags(self):
+        self.assertBudget(1, self.guest_client, 'get', '/api/tags/')
+        self.assertBudget(0, self.guest_client, 'get', '/api/tags/')
+        self.assertBudget(
+            0, self.guest_client, 'get', f'/api/tags/{self.tags[0].id}/'
+        )
+
+    def test_ingredients(self):
+        self.assertBudget(1, self.guest_client, 'get', '/api/ingredients/')
+        self.assertBudget(
+            1, self.guest_client, 'get', '/api/ingredients/?name=Ингр'
+        )
+        self.assertBudget(
+            0, self.guest_client, 'get',
+            f'/api/ingredients/{self.ingredients[0].id}/'
+        )
+
+
+class RecipeReadQueryTest(QueryBudgetTestCase):
+
+    def test_list_guest(self):
+        response = self.assertBudget(
+            6, self.guest_client, 'get', f'/api/recipes/?limit={PAGE_SIZE}'
+        )
+        self.assertEqual(len(response.data['results']), PAGE_SIZE)
+
+    def test_list_authorized(self):
+        response = self.assertBudget(
+            6, self.auth_client, 'get', f'/api/recipes/?limit={PAGE_SIZE}'
+        )
+        self.assertEqual(len(response.data['results']), PAGE_SIZE)
+
+    def test_list_cursor(self):
+        response = self.assertBudget(
+            5, self.auth_client, 'get',
+            f'/api/recipes/?limit={PAGE_SIZE}&cursor='
+        )
+        self.assertBudget(
+            5, self.auth_client, 'get', response.data['next']
+        )
+
+    def test_list_filtered(self):
+        self.assertBudget(
+            6, self.auth_client, 'get',
+            f'/api/recipes/?limit={PAGE_SIZE}&is_favorited=1'
+        )
+        self.assertBudget(
+            6, self.auth_client, 'get',
+            f'/api/recipes/?limit={PAGE_SIZE}&is_in_shopping_cart=1'
+        )
+        self.assertBudget(
+            7, self.auth_client, 'get',
+            f'/api/recipes/?limit={PAGE_SIZE}'
+            f'&tags={self.tags[0].slug}&tags={self.tags[1].slug}'
+        )
+        self.assertBudget(
+            6, self.auth_client, 'get',
+            f'/api/recipes/?limit={PAGE_SIZE}&search=Рецепт'
+        )
+        self.assertBudget(
+            6, self.auth_client, 'get',
+            f'/api/recipes/?limit={PAGE_SIZE}&max_missing=2&ingredients='
+            + ','.join(str(item.id) for item in self.ingredients[:10])
+        )
+
+    def test_feed(self):
+        response = self.assertBudget(
+            6, self.auth_client, 'get', '/api/recipes/feed/?limit=20'
+        )
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertBudget(6, self.auth_client, 'get', response.data['next'])
+
+    def test_detail(self):
+        url = f'/api/recipes/{self.free_recipe.id}/'
+        self.assertBudget(5, self.guest_client, 'get', url)
+        self.assertBudget(5, self.auth_client, 'get', url)
+
+
+class RecipeWriteQueryTest(QueryBudgetTestCase):
+
+    def test_create(self):
+        self.assertBudget(
+            15, self.auth_client, 'post', '/api/recipes/',
+            self.recipe_data('Новый рецепт'),
+            expected_status=status.HTTP_201_CREATED
+        )
+
+    def test_update(self):
+        self.assertBudget(
+            17, self.auth_client, 'patch',
+            f'/api/recipes/{self.own_recipe.id}/',
+            self.recipe_data('Обновленный рецепт'),
+        )
+
+    def test_update_keeps_unchanged_rows(self):
+        recipe = self.own_recipe
+        rows = dict(recipe.ingredients_in_recipe.values_list(
+            'ingredient_id', 'id'
+        ))
+        data = self.recipe_data(recipe.name)
+        data['ingredients'] = [
+            {'id': ingredient_id, 'amount': 1} for ingredient_id in rows
+        ][1:]
+        self.auth_client.patch(
+            f'/api/recipes/{recipe.id}/', data, format='json'
+        )
+        self.assertEqual(
+            dict(recipe.ingredients_in_recipe.values_list(
+                'ingredient_id', 'id'
+            )),
+            {
+                ingredient_id: row_id
+                for ingredient_id, row_id in list(rows.items())[1:]
+            }
+        )
+
+    def test_update_text_only(self):
+        response = self.assertBudget(
+            10, self.auth_client, 'patch',
+            f'/api/recipes/{self.own_recipe.id}/', {'text': 'Новый текст'}
+        )
+        self.assertEqual(response.data['text'], 'Новый текст')
+
+    def test_delete(self):
+        self.assertBudget(
+            11, self.auth_client, 'delete',
+            f'/api/recipes/{self.own_recipe.id}/',
+            expected_status=status.HTTP_204_NO_CONTENT
+        )
+
+
+class RecipeActionQueryTest(QueryBudgetTestCase):
+
+    def test_favorite(self):
+        url = f'/api/recipes/{self.free_recipe.id}/favorite/'
+        self.assertBudget(
+            8, self.auth_client, 'post', url,
+            expected_status=status.HTTP_201_CREATED
+        )
+        self.assertBudget(
+            3, self.auth_client, 'delete', url,
+            expected_status=status.HTTP_204_NO_CONTENT
+        )
+
+    def test_shopping_cart(self):
+        url = f'/api/recipes/{self.free_recipe.id}/shopping_cart/'
+        self.assertBudget(
+            9, self.auth_client, 'post', url,
+            expected_status=status.HTTP_201_CREATED
+        )
+        self.assertBudget(
+            5, self.auth_client, 'delete', url,
+            expected_status=status.HTTP_204_NO_CONTENT
+        )
+
+    def test_download_shopping_cart(self):
+        for file_format in ('txt', 'csv', 'pdf'):
+            self.assertBudget(
+                2, self.auth_client, 'get',
+                f'/api/recipes/download_shopping_cart/?format={file_format}'
+            )
+
+
+class UserQueryTest(QueryBudgetTestCase):
+
+    def test_users(self):
+        self.assertBudget(2, self.guest_client, 'get', '/api/users/')
+        self.assertBudget(2, self.auth_client, 'get', '/api/users/')
+        self.assertBudget(
+            1, self.auth_client, 'get', f'/api/users/{self.users[1].id}/'
+        )
+        self.assertBudget(1, self.auth_client, 'get', '/api/users/me/')
+
+    def test_subscriptions(self):
+        response = self.assertBudget(
+            3, self.auth_client, 'get',
+            '/api/users/subscriptions/?limit=20&recipes_limit=2'
+        )
+        self.assertEqual(len(response.data['results']), USERS - 2)
+
+    def test_subscribe(self):
+        url = f'/api/users/{self.unfollowed.id}/subscribe/'
+        self.assertBudget(
+            11, self.auth_client, 'post', url,
+            expected_status=status.HTTP_201_CREATED
+        )
+        self.assertBudget(
+            5, self.auth_client, 'delete', url,
+            expected_status=status.HTTP_204_NO_CONTENT
+        )
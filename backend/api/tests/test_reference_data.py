@@ -0,0 +1,41 @@
+from api.tests.test_query_counts import QueryBudgetTestCase
+from recipes.models import Tag
+
+
+class ReferenceSnapshotTest(QueryBudgetTestCase):
+
+    def test_not_modified_without_queries(self):
+        response = self.guest_client.get('/api/tags/')
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                '/api/tags/', HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_differs_between_resources(self):
+        tags = self.guest_client.get('/api/tags/')['ETag']
+        tag = self.guest_client.get(f'/api/tags/{self.tags[0].id}/')['ETag']
+        self.assertNotEqual(tags, tag)
+        response = self.guest_client.get(
+            f'/api/tags/{self.tags[0].id}/', HTTP_IF_NONE_MATCH=tags
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_change_rebuilds_snapshot(self):
+        etag = self.guest_client.get('/api/tags/')['ETag']
+        Tag.objects.create(name='Новый', color='#FFFFFF', slug='new')
+        response = self.assertBudget(1, self.guest_client, 'get', '/api/tags/')
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(len(response.data), len(self.tags) + 1)
+        response = self.guest_client.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_missing_object(self):
+        self.assertBudget(
+            1, self.guest_client, 'get', '/api/ingredients/0/',
+            expected_status=404
+        )
@@ -0,0 +1,91 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+
+@override_settings(
+    DATABASE_REPLICAS=['replica'], RECIPE_IMAGE_WORKERS=0, SHARED_CACHE=True
+)
+class ReplicaRouterTest(TransactionTestCase):
+    databases = {DEFAULT_DB_ALIAS, 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create(
+            username='cook', email='cook@foodgram.ru'
+        )
+        self.tag = Tag.objects.create(
+            name='Завтрак', color='#FFAA00', slug='breakfast'
+        )
+        self.recipe = Recipe.objects.create(
+            name='Омлет', author=self.user, image='recipe_images/test.png',
+            text='Описание', cooking_time=10
+        )
+        self.client = APIClient()
+        self.auth_client = APIClient()
+        self.auth_client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+        # Токен попадает в кеш аутентификации до замеров.
+        self.auth_client.get('/api/users/me/')
+        cache.delete_many([
+            'recipes:written', 'tags:written', 'ingredients:written'
+        ])
+
+    def request(self, client, method, url):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primary:
+            with CaptureQueriesContext(connections['replica']) as replica:
+                response = getattr(client, method)(url)
+        return response, len(primary), len(replica)
+
+    def test_reads_go_to_replica(self):
+        for url in (
+            '/api/recipes/', f'/api/recipes/{self.recipe.id}/',
+            '/api/tags/', f'/api/users/{self.user.id}/'
+        ):
+            with self.subTest(url=url):
+                response, primary, replica = self.request(
+                    self.client, 'get', url
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(primary, 0)
+                self.assertGreater(replica, 0)
+
+    def test_writer_sticks_to_primary(self):
+        response, primary, replica = self.request(
+            self.auth_client, 'get', '/api/recipes/'
+        )
+        self.assertEqual((primary > 0, replica > 0), (False, True))
+        response, primary, replica = self.request(
+            self.auth_client, 'post',
+            f'/api/recipes/{self.recipe.id}/favorite/'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(replica, 0)
+        response, primary, replica = self.request(
+            self.auth_client, 'get', f'/api/recipes/{self.recipe.id}/'
+        )
+        self.assertTrue(response.data['is_favorited'])
+        self.assertEqual((primary > 0, replica > 0), (True, False))
+        response, primary, replica = self.request(
+            self.client, 'get', '/api/tags/'
+        )
+        self.assertEqual((primary > 0, replica > 0), (False, True))
+
+    def test_shared_cache_is_filled_from_primary_after_write(self):
+        self.recipe.name = 'Омлет с сыром'
+        self.recipe.save()
+        response, primary, replica = self.request(
+            self.client, 'get', '/api/recipes/'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual((primary > 0, replica > 0), (True, False))
@@ -0,0 +1,76 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from api.tests.test_query_counts import PAGE_SIZE, QueryBudgetTestCase
+
+
+class ResponseCacheTest(QueryBudgetTestCase):
+
+    url = f'/api/recipes/?limit={PAGE_SIZE}'
+
+    def test_guest_list_is_cached(self):
+        first = self.assertBudget(6, self.guest_client, 'get', self.url)
+        second = self.assertBudget(0, self.guest_client, 'get', self.url)
+        self.assertEqual(first['X-Cache'], 'MISS')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(first.data, second.data)
+
+    def test_guest_detail_is_cached(self):
+        url = f'/api/recipes/{self.free_recipe.id}/'
+        self.assertBudget(5, self.guest_client, 'get', url)
+        self.assertBudget(0, self.guest_client, 'get', url)
+
+    def test_tags_order_does_not_matter(self):
+        first, second = self.tags[0].slug, self.tags[1].slug
+        self.guest_client.get(f'{self.url}&tags={first}&tags={second}')
+        response = self.assertBudget(
+            0, self.guest_client, 'get',
+            f'{self.url}&tags={second}&tags={first}'
+        )
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_authorized_and_unknown_params_bypass_cache(self):
+        self.auth_client.get(self.url)
+        response = self.assertBudget(6, self.auth_client, 'get', self.url)
+        self.assertNotIn('X-Cache', response)
+        url = f'{self.url}&author={self.user.id}'
+        self.guest_client.get(url)
+        response = self.guest_client.get(url)
+        self.assertNotIn('X-Cache', response)
+
+    def test_recipe_change_invalidates(self):
+        self.guest_client.get(self.url)
+        recipe = self.recipes[-1]
+        recipe.name = 'Новое название'
+        recipe.save()
+        response = self.assertBudget(6, self.guest_client, 'get', self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['name'], recipe.name)
+
+    def test_tag_and_author_changes_invalidate(self):
+        self.guest_client.get(self.url)
+        recipe = self.recipes[-1]
+        recipe.tags.remove(self.tags[0])
+        recipe.save()
+        self.assertEqual(self.guest_client.get(self.url)['X-Cache'], 'MISS')
+        author = recipe.author
+        author.save(update_fields=('last_login',))
+        self.assertEqual(self.guest_client.get(self.url)['X-Cache'], 'HIT')
+        author.first_name = 'Другое'
+        author.save()
+        self.assertEqual(self.guest_client.get(self.url)['X-Cache'], 'MISS')
+
+    def test_counter_changes_keep_cache(self):
+        url = f'/api/recipes/{self.free_recipe.id}/'
+        self.guest_client.get(url)
+        self.auth_client.post(f'{url}favorite/')
+        self.assertEqual(self.guest_client.get(url)['X-Cache'], 'HIT')
+        with override_settings(COUNTERS_CACHE_TIMEOUT=0):
+            cache.clear()
+            self.guest_client.get(url)
+            response = self.guest_client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(
+            response.data['favorites_count'],
+            self.free_recipe.in_favorites.count()
+        )
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, Tag
+
+User = get_user_model()
+
+
+class RecipeSearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='cook', email='cook@foodgram.ru'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        cls.soup_tag = Tag.objects.create(
+            name='Супы', color='#00FF00', slug='soups'
+        )
+        recipes = {
+            'text_match': ('Обед', 'Украинский Борщ на говяжьем бульоне'),
+            'name_match': ('Борщ', 'Классический рецепт'),
+            'other': ('Омлет', 'Взбить яйца'),
+        }
+        cls.recipes = {
+            key: Recipe.objects.create(
+                name=name, text=text, author=cls.user,
+                image='recipe_images/test.png', cooking_time=10
+            )
+            for key, (name, text) in recipes.items()
+        }
+        cls.recipes['name_match'].tags.add(cls.soup_tag)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def search(self, query, **params):
+        response = self.client.get(
+            '/api/recipes/', {'search': query, **params}
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_matches_rank_first(self):
+        self.assertEqual(
+            self.search('Борщ'),
+            [self.recipes['name_match'].id, self.recipes['text_match'].id]
+        )
+
+    def test_combines_with_filters(self):
+        self.assertEqual(
+            self.search('Борщ', tags='soups'),
+            [self.recipes['name_match'].id]
+        )
+        Favorite.objects.create(
+            user=self.user, recipe=self.recipes['text_match']
+        )
+        self.assertEqual(
+            self.search('Борщ', is_favorited=1),
+            [self.recipes['text_match'].id]
+        )
+
+    def test_paginated(self):
+        response = self.client.get(
+            '/api/recipes/', {'search': 'Борщ', 'limit': 1}
+        )
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes['name_match'].id]
+        )
+
+    def test_blank_query_is_ignored(self):
+        self.assertEqual(len(self.search(' ')), 3)
@@ -0,0 +1,31 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import FeedEntry, Ingredient, IngredientAmount, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class SeedCommandTest(TestCase):
+
+    def test_small_volumes(self):
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f'Ингредиент{index}', measurement_unit='г')
+            for index in range(5)
+        )
+        call_command(
+            'seed_foodgram', users=6, tags=2, recipes=20,
+            ingredients_per_recipe=3, favorites=15, shopping_carts=10,
+            subscriptions=12, batch_size=7, stdout=StringIO()
+        )
+        self.assertEqual(User.objects.count(), 6)
+        self.assertEqual(Recipe.objects.count(), 20)
+        self.assertEqual(IngredientAmount.objects.count(), 60)
+        self.assertEqual(Subscription.objects.count(), 12)
+        self.assertTrue(FeedEntry.objects.exists())
+        call_command('reconcile_counters', '--check', stdout=StringIO())
+        call_command('rebuild_shopping_lists', '--check', stdout=StringIO())
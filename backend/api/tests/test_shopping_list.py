@@ -0,0 +1,159 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import (
+    Ingredient, IngredientAmount, Recipe, ShoppingCart,
+    ShoppingListItem, Tag
+)
+
+User = get_user_model()
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+class DownloadShoppingCartTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='cook', email='cook@foodgram.ru'
+        )
+        cls.other = User.objects.create(
+            username='guest', email='guest@foodgram.ru'
+        )
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        sugar = Ingredient.objects.create(name='сахар', measurement_unit='г')
+        cls.milk = Ingredient.objects.create(
+            name='молоко', measurement_unit='мл'
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        cls.recipes = []
+        for name in ('Пирог', 'Каша'):
+            recipe = Recipe.objects.create(
+                name=name, author=cls.user, image='recipe_images/test.png',
+                text='Описание', cooking_time=10
+            )
+            IngredientAmount.objects.bulk_create((
+                IngredientAmount(recipe=recipe, ingredient=salt, amount=2),
+                IngredientAmount(recipe=recipe, ingredient=sugar, amount=5),
+            ))
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, file_format=None):
+        params = {'format': file_format} if file_format else {}
+        response = self.client.get(URL, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response, b''.join(response.streaming_content)
+
+    def test_text_is_default(self):
+        response, content = self.download()
+        self.assertEqual(response['Content-Type'], 'text/plain')
+        self.assertEqual(
+            content.decode(), '1. сахар(г) — 10\n2. соль(г) — 4\n'
+        )
+
+    def test_csv(self):
+        response, content = self.download('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="list.csv"',
+                      response['Content-Disposition'])
+        self.assertEqual(content.decode().splitlines()[1:], [
+            'сахар,г,10', 'соль,г,4'
+        ])
+
+    def test_pdf(self):
+        response, content = self.download('pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+
+    def test_empty_cart(self):
+        ShoppingCart.objects.all().delete()
+        response = self.client.get(URL, {'format': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response.json(), {'error': 'Список покупок пуст'})
+
+
+class ShoppingListTotalsTest(DownloadShoppingCartTest):
+
+    def totals(self, user):
+        return dict(user.shopping_list_items.values_list(
+            'ingredient__name', 'total_amount'
+        ))
+
+    def assertNoDrift(self):
+        call_command('rebuild_shopping_lists', '--check', stdout=StringIO())
+
+    def test_cart_changes(self):
+        recipe = self.recipes[0]
+        self.client.delete(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(self.totals(self.user), {'сахар': 5, 'соль': 2})
+        self.client.force_authenticate(self.other)
+        self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertEqual(self.totals(self.other), {'сахар': 5, 'соль': 2})
+        self.assertNoDrift()
+
+    def test_recipe_changes(self):
+        recipe = self.recipes[0]
+        response = self.client.patch(
+            f'/api/recipes/{recipe.id}/',
+            {
+                'ingredients': [
+                    {'id': self.milk.id, 'amount': 200},
+                    {'id': recipe.ingredients.get(name='соль').id,
+                     'amount': 3},
+                ],
+                'tags': [self.tag.id],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.totals(self.user), {'сахар': 5, 'соль': 5, 'молоко': 200}
+        )
+        self.recipes[1].delete()
+        self.assertEqual(self.totals(self.user), {'соль': 3, 'молоко': 200})
+        self.assertNoDrift()
+
+    def test_direct_amount_changes(self):
+        salt = IngredientAmount.objects.get(
+            recipe=self.recipes[0], ingredient__name='соль'
+        )
+        salt.amount = 7
+        salt.save()
+        self.assertEqual(self.totals(self.user), {'сахар': 10, 'соль': 9})
+        milk = IngredientAmount.objects.create(
+            recipe=self.recipes[0], ingredient=self.milk, amount=100
+        )
+        self.assertEqual(
+            self.totals(self.user), {'сахар': 10, 'соль': 9, 'молоко': 100}
+        )
+        ShoppingCart.objects.filter(recipe=self.recipes[1]).delete()
+        milk.recipe = self.recipes[1]
+        milk.save()
+        self.assertEqual(self.totals(self.user), {'сахар': 5, 'соль': 7})
+        salt.delete()
+        self.assertEqual(self.totals(self.user), {'сахар': 5})
+        self.assertNoDrift()
+
+    def test_rebuild(self):
+        ShoppingListItem.objects.filter(user=self.user).update(
+            total_amount=1
+        )
+        with self.assertRaises(CommandError):
+            self.assertNoDrift()
+        call_command('rebuild_shopping_lists', stdout=StringIO())
+        self.assertEqual(self.totals(self.user), {'сахар': 10, 'соль': 4})
+        self.assertNoDrift()
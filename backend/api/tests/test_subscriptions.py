@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+URL = '/api/users/subscriptions/'
+
+
+class SubscriptionsRecipesLimitTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(
+            username='reader', email='reader@foodgram.ru'
+        )
+        cls.authors = []
+        for index, recipes in enumerate((3, 1, 0)):
+            author = User.objects.create(
+                username=f'author{index}', email=f'author{index}@foodgram.ru',
+                last_name=f'Автор{index}'
+            )
+            for number in range(recipes):
+                Recipe.objects.create(
+                    name=f'Рецепт{number}', author=author,
+                    image='recipe_images/test.png', text='Описание',
+                    cooking_time=10
+                )
+            Subscription.objects.create(user=cls.user, author=author)
+            cls.authors.append(author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_limit_per_author(self):
+        response = self.client.get(URL, {'recipes_limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.data['results']
+        self.assertEqual(
+            [len(author['recipes']) for author in results], [2, 1, 0]
+        )
+        self.assertEqual(
+            [author['recipes_count'] for author in results], [3, 1, 0]
+        )
+        self.assertEqual(
+            [recipe['name'] for recipe in results[0]['recipes']],
+            ['Рецепт2', 'Рецепт1']
+        )
+
+    def test_latest_reads_short_fields(self):
+        author_ids = [author.pk for author in self.authors]
+        for limit in (None, 2):
+            with self.assertNumQueries(1):
+                recipes = list(
+                    Recipe.objects.latest_by_authors(author_ids, limit)
+                )
+            self.assertEqual(len(recipes), 3 if limit else 4)
+            self.assertLessEqual(
+                {'text', 'search_vector'}, recipes[0].get_deferred_fields()
+            )
+
+    def test_without_limit(self):
+        response = self.client.get(URL)
+        self.assertEqual(
+            [len(author['recipes']) for author in response.data['results']],
+            [3, 1, 0]
+        )
+
+    def test_invalid_limit(self):
+        for value in ('abc', '0', '-1'):
+            response = self.client.get(URL, {'recipes_limit': value})
+            self.assertEqual(
+                response.status_code, status.HTTP_400_BAD_REQUEST
+            )
+        Subscription.objects.filter(author=self.authors[0]).delete()
+        response = self.client.post(
+            f'/api/users/{self.authors[0].id}/subscribe/?recipes_limit=abc'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Subscription.objects.filter(
+            author=self.authors[0]
+        ).exists())
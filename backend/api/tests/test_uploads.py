@@ -0,0 +1,82 @@
+import base64
+import json
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from rest_framework import status
+
+from api.tests.test_query_counts import IMAGE, QueryBudgetTestCase
+from recipes.models import Recipe
+
+PNG = base64.b64decode(IMAGE.split(',')[1])
+
+
+class ImageUploadTest(QueryBudgetTestCase):
+
+    def multipart_data(self, name):
+        data = self.recipe_data(name)
+        data['tags'] = json.dumps(data['tags'])
+        data['ingredients'] = json.dumps(data['ingredients'])
+        data['image'] = self.png_file()
+        return data
+
+    @staticmethod
+    def png_file():
+        return SimpleUploadedFile('photo.png', PNG, 'image/png')
+
+    def test_multipart_create(self):
+        response = self.auth_client.post(
+            '/api/recipes/', self.multipart_data('Из формы'),
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertTrue(recipe.image.name.endswith('.png'))
+        self.assertNotIn('photo', recipe.image.name)
+        self.assertEqual(recipe.ingredients.count(), len(
+            self.recipe_data('')['ingredients']
+        ))
+
+    def test_multipart_json_like_text(self):
+        data = self.multipart_data('Текст списком')
+        data['text'] = '["шаг 1", "шаг 2"]'
+        response = self.auth_client.post(
+            '/api/recipes/', data, format='multipart'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['text'], data['text'])
+
+    def test_raw_upload(self):
+        url = f'/api/recipes/{self.own_recipe.id}/image/'
+        response = self.auth_client.generic(
+            'POST', url, PNG, content_type='image/png'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.own_recipe.refresh_from_db()
+        self.assertTrue(self.own_recipe.image.name.endswith('.png'))
+        response = self.auth_client.generic(
+            'POST', url, b'not an image', content_type='image/png'
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.auth_client.generic(
+            'POST', f'/api/recipes/{self.free_recipe.id}/image/', PNG,
+            content_type='image/png'
+        )
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    @override_settings(RECIPE_UPLOAD_MAX_SIZE=len(PNG) - 1)
+    def test_size_limit(self):
+        response = self.auth_client.generic(
+            'POST', f'/api/recipes/{self.own_recipe.id}/image/', PNG,
+            content_type='image/png'
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
+        response = self.auth_client.post(
+            '/api/recipes/', self.multipart_data('Большой'),
+            format='multipart'
+        )
+        self.assertEqual(
+            response.status_code, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+        )
@@ -1,6 +1,8 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
+from api.async_views import async_read_urls
 from api.views import (
     CustomUserViewSet, IngredientViewSet, RecipeViewSet,
     TagViewSet
@@ -15,6 +17,11 @@ router_v1.register(r'recipes', RecipeViewSet, basename='recipes')
 router_v1.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router_v1.register(r'users', CustomUserViewSet, basename='users')
 
+router_urls = router_v1.urls
+if settings.ASYNC_READ_VIEWS:
+    router_urls = async_read_urls(router_urls, (
+        CustomUserViewSet, IngredientViewSet, RecipeViewSet, TagViewSet
+    ))
 
 auth_urls = [
     path('', include('djoser.urls')),
@@ -22,6 +29,6 @@ auth_urls = [
 ]
 
 urlpatterns = [
-    path('', include(router_v1.urls)),
+    path('', include(router_urls)),
     path('auth/', include(auth_urls)),
 ]
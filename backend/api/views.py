@@ -1,58 +1,102 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
-from rest_framework import status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from api.cache import (
+    AnonymousResponseCacheMixin, ConditionalResponseMixin, get_changed_at,
+    get_version, make_etag
+)
+from api.catalog import (
+    ReferenceSnapshotMixin, ingredient_catalog, tag_snapshot
+)
 from api.filters import IngredientFilter, RecipeFilter
-from api.paginators import CustomPageNumberPaginator
+from api.paginators import CursorOrPageNumberPaginator, MergedKeysetPaginator
+from api.parsers import (
+    ImageUploadParser, LimitedTemporaryFileUploadHandler, MultiPartJSONParser
+)
 from api.permissions import IsAuthorAdminOrReadOnly
+from api.renderers import (
+    CSVShoppingListRenderer, PDFShoppingListRenderer,
+    TextShoppingListRenderer
+)
+from api.replicas import ReplicaReadMixin
 from api.serializers import (
     AddRecipeSerializer, CustomUserSerializer,
-    FavoriteSerializer, IngredientSerializer,
+    FavoriteSerializer, IngredientSerializer, RecipesLimitSerializer,
     RecipeSerializer, ShoppingCartSerializer,
     SubscribeUnsubscribeSerializer,
     SubscriptionsSerializer, TagSerializer
 )
-from recipes.models import (
-    Favorite, Ingredient, IngredientAmount, Recipe,
-    ShoppingCart, Tag
-)
+from api.shopping_list import SHOPPING_LIST_FORMATS
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
 from users.models import Subscription
 
 User = get_user_model()
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ReplicaReadMixin, ReferenceSnapshotMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """ Теги """
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    snapshot = tag_snapshot
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, ReferenceSnapshotMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """ Ингредиенты """
 
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
+    snapshot = ingredient_catalog
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        if settings.INGREDIENT_SEARCH_CACHE:
+            return self.snapshot_response(
+                request, lambda snapshot: ingredient_catalog.search(name)
+            )
+        return mixins.ListModelMixin.list(self, request, *args, **kwargs)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, AnonymousResponseCacheMixin,
+                    ConditionalResponseMixin, viewsets.ModelViewSet):
     """ Рецепты """
 
+    cache_namespace = 'recipes'
+    cached_query_params = frozenset((
+        'tags', 'page', 'limit', 'cursor', 'search', 'ingredients',
+        'max_missing'
+    ))
     http_method_names = ('get', 'post', 'patch', 'delete')
     permission_classes = (IsAuthorAdminOrReadOnly,)
-    pagination_class = CustomPageNumberPaginator
+    parser_classes = (JSONParser, MultiPartJSONParser)
+    pagination_class = CursorOrPageNumberPaginator
+    keyset_ordering = ('-pub_date', '-id')
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def initialize_request(self, request, *args, **kwargs):
+        request.upload_handlers = [LimitedTemporaryFileUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeSerializer
@@ -60,12 +104,116 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         user = self.request.user
+        if self.action in ('list', 'retrieve'):
+            return Recipe.objects.with_related(user)
         if not user.is_authenticated:
             return Recipe.objects.all()
         return Recipe.objects.with_annotations(user)
 
+    def get_cache_timeout(self):
+        return settings.COUNTERS_CACHE_TIMEOUT
+
+    def get_detail_validators(self, request):
+        """ Счетчики сдвигают updated_at рецепта и автора, поэтому для
+        анонимных есть и Last-Modified. Отметку корзины пользователя
+        время не отражает, для него только ETag """
+
+        try:
+            state = Recipe.objects.with_state(request.user).filter(
+                pk=self.kwargs['pk']
+            ).first()
+        except (TypeError, ValueError):
+            return None
+        if state is None:
+            return None
+        if request.user.is_authenticated:
+            return make_etag(request, *state), None
+        return make_etag(request, *state), max(state[:2])
+
+    def get_list_validators(self, request):
+        """ Валидаторы общие для всех выборок: версия данных рецептов и
+        сводка по индексам, без агрегатов по отфильтрованным рецептам.
+        Удаления сдвигают только версию, поэтому Last-Modified учитывает
+        и время ее последнего повышения """
+
+        state = Recipe.objects.list_state(request.user) or ()
+        etag = make_etag(
+            request, request.user.pk, get_version(self.cache_namespace),
+            *state
+        )
+        if request.user.is_authenticated:
+            return etag, None
+        return etag, max(
+            get_changed_at(self.cache_namespace),
+            *(updated_at for updated_at in state if updated_at is not None)
+        )
+
+    @action(
+        detail=False,
+        methods=('post',),
+        permission_classes=(IsAuthenticated,)
+    )
+    def bulk(self, request):
+        """ Добавить несколько рецептов одной транзакцией """
+
+        serializer = self.get_serializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=settings.RECIPE_BULK_LIMIT,
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        detail=True,
+        methods=('post',),
+        parser_classes=(ImageUploadParser,)
+    )
+    def image(self, request, pk):
+        """ Заменить изображение рецепта, тело запроса — файл """
+
+        if 'file' not in request.data:
+            raise ParseError('Передайте изображение в теле запроса')
+        upload = request.data['file']
+        try:
+            serializer = self.get_serializer(
+                self.get_object(), data={'image': upload}, partial=True
+            )
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+        finally:
+            upload.close()
+        return Response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=('get',),
+        permission_classes=(IsAuthenticated,),
+        pagination_class=MergedKeysetPaginator,
+    )
+    def feed(self, request):
+        """ Новые рецепты авторов из подписок, страницы по курсору """
+
+        keys = self.paginate_queryset(Recipe.objects.feed(request.user))
+        recipes = Recipe.objects.with_related(request.user).in_bulk(
+            [recipe_id for pub_date, recipe_id in keys]
+        )
+        page = [
+            recipes[recipe_id] for pub_date, recipe_id in keys
+            if recipe_id in recipes
+        ]
+        serializer = RecipeSerializer(
+            page, many=True, context=self.get_serializer_context()
+        )
+        return self.get_paginated_response(serializer.data)
+
     @staticmethod
+    @transaction.atomic
     def recipe_save(serializer, pk, request):
+        """ Строка корзины и суммы списка покупок пишутся одной
+        транзакцией """
 
         data = {
             'user': request.user.id,
@@ -111,48 +259,52 @@ class RecipeViewSet(viewsets.ModelViewSet):
         get_object_or_404(ShoppingCart, user=request.user, recipe=pk).delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @staticmethod
-    def file_generation(shopping_cart):
-        """ Формирование файла со списком покупок """
-
-        response = HttpResponse(content_type='text/plain')
-        response['Content-Disposition'] = 'attachment; filename="list.txt"'
-        for index, products in enumerate(shopping_cart, 1):
-            name, unit, amount = products
-            response.write(
-                f'{index}. {products[name]}'
-                f'({products[unit]}) — {products[amount]}\n'
-            )
-        if not response.content:
-            return Response(
-                {'error': 'Список покупок пуст'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        return response
-
     @action(
         detail=False,
         methods=('get',),
-        permission_classes=[IsAuthenticated, ]
+        permission_classes=[IsAuthenticated, ],
+        renderer_classes=(
+            TextShoppingListRenderer,
+            CSVShoppingListRenderer,
+            PDFShoppingListRenderer,
+        )
     )
     def download_shopping_cart(self, request):
-        """ Скачивание списка покупок """
-
-        shopping_cart = IngredientAmount.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(
-            total_amount=Sum('amount')
-        ).order_by('ingredient__name')
+        """ Скачивание списка покупок в формате txt, csv или pdf """
 
-        return self.file_generation(shopping_cart)
+        if not request.user.shopping_cart.exists():
+            return Response(
+                {'error': 'Список покупок пуст'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        shopping_cart = request.user.shopping_list_items.order_by(
+            'ingredient__name'
+        ).values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'total_amount'
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            SHOPPING_LIST_FORMATS[renderer.format](
+                shopping_cart.iterator(chunk_size=2000)
+            ),
+            content_type=renderer.media_type
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="list.{renderer.format}"'
+        )
+        return response
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ReplicaReadMixin, UserViewSet):
     """ Пользователи """
 
-    pagination_class = CustomPageNumberPaginator
+    pagination_class = CursorOrPageNumberPaginator
+    keyset_ordering = ('last_name', 'first_name', 'id')
+
+    def get_queryset(self):
+        if self.action in ('list', 'retrieve'):
+            return User.objects.with_is_subscribed(self.request.user)
+        return super().get_queryset()
 
     @action(
         methods=['GET'],
@@ -160,10 +312,12 @@ class CustomUserViewSet(UserViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def me(self, request):
-        """Метод обработки запросов на users/me/"""
+        """ Метод обработки запросов на users/me/. Пользователь из
+        кеша аутентификации не содержит счетчиков, они читаются заново """
 
         serializer = CustomUserSerializer(
-            request.user, context={'request': request}
+            User.objects.get(pk=request.user.pk),
+            context={'request': request}
         )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -179,10 +333,26 @@ class CustomUserViewSet(UserViewSet):
             User.objects.filter(following__user=self.request.user)
         )
         serializer = SubscriptionsSerializer(
-            pages, context={'request': request}, many=True
+            pages, context=self.subscriptions_context(pages), many=True
         )
         return self.get_paginated_response(serializer.data)
 
+    def subscriptions_context(self, authors):
+        """ Рецепты всех авторов страницы одним запросом """
+
+        params = RecipesLimitSerializer(data=self.request.query_params)
+        params.is_valid(raise_exception=True)
+        recipes_by_author = defaultdict(list)
+        for recipe in Recipe.objects.latest_by_authors(
+            [author.pk for author in authors],
+            params.validated_data.get('recipes_limit')
+        ):
+            recipes_by_author[recipe.author_id].append(recipe)
+        return {
+            'request': self.request,
+            'recipes_by_author': recipes_by_author,
+        }
+
     @action(
         methods=('post',),
         detail=True,
@@ -192,13 +362,15 @@ class CustomUserViewSet(UserViewSet):
         """ Метод подписки на автора """
 
         author = get_object_or_404(User, id=id)
+        context = self.subscriptions_context((author,))
         serializer = SubscribeUnsubscribeSerializer(
             data={'user': request.user.id, 'author': author.id},
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        author.refresh_from_db(fields=('followers_count',))
         return Response(
-            SubscriptionsSerializer(author, context={'request': request}).data,
+            SubscriptionsSerializer(author, context=context).data,
             status=status.HTTP_201_CREATED
         )
 
@@ -0,0 +1,162 @@
+import logging
+import os
+from functools import partial
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.db.backends.postgresql.base import \
+    DatabaseWrapper as PostgreSQLDatabaseWrapper
+from psycopg2 import Error, OperationalError
+from psycopg2.extensions import (
+    TRANSACTION_STATUS_IDLE, TRANSACTION_STATUS_UNKNOWN
+)
+
+from foodgram_backend.db.pool import (
+    ConnectionMetrics, ConnectionPool, PoolTimeout
+)
+
+logger = logging.getLogger(__name__)
+
+POOL_OPTIONS = ('pool_size', 'pool_timeout')
+
+_pools = {}
+_metrics = {}
+_lock = Lock()
+_reported = perf_counter()
+
+
+def get_metrics(alias):
+    with _lock:
+        if alias not in _metrics:
+            _metrics[alias] = ConnectionMetrics()
+        return _metrics[alias]
+
+
+def connection_metrics(reset=False):
+    """ Ожидание и занятость соединений процесса по алиасам базы """
+
+    with _lock:
+        metrics = dict(_metrics)
+    result = {}
+    for alias, alias_metrics in metrics.items():
+        result[alias] = alias_metrics.snapshot()
+        if reset:
+            alias_metrics.reset()
+    return result
+
+
+def report_metrics():
+    """ Раз в DB_METRICS_INTERVAL секунд пишет метрики в лог """
+
+    global _reported
+    if not settings.DB_METRICS_INTERVAL:
+        return
+    with _lock:
+        if perf_counter() - _reported < settings.DB_METRICS_INTERVAL:
+            return
+        _reported = perf_counter()
+    for alias, metrics in connection_metrics(reset=True).items():
+        logger.info(
+            'Соединения с базой %s, pid %s: %s', alias, os.getpid(), metrics
+        )
+
+
+class DatabaseWrapper(PostgreSQLDatabaseWrapper):
+    """ PostgreSQL с метриками соединений и необязательным пулом.
+
+    При OPTIONS['pool_size'] > 0 потоки процесса берут соединения из
+    общего пула и возвращают их в конце запроса вместо закрытия, так
+    соединений с базой не больше pool_size на процесс при любом числе
+    потоков. При CONN_HEALTH_CHECKS соединение из пула проверяется
+    перед выдачей. Пул заводится отдельно в каждом процессе после fork. """
+
+    checked_out_at = None
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in POOL_OPTIONS:
+            params.pop(option, None)
+        return params
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict['OPTIONS']
+        if not options.get('pool_size'):
+            return None
+        key = (os.getpid(), repr(sorted(conn_params.items())))
+        with _lock:
+            if key not in _pools:
+                _pools[key] = ConnectionPool(
+                    partial(super().get_new_connection, conn_params),
+                    size=options['pool_size'],
+                    timeout=options.get('pool_timeout', 10),
+                    metrics=get_metrics(self.alias),
+                )
+            return _pools[key]
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        if pool is None:
+            started = perf_counter()
+            connection = super().get_new_connection(conn_params)
+            elapsed = perf_counter() - started
+            metrics = get_metrics(self.alias)
+            metrics.observe('connect', elapsed)
+            metrics.observe('wait', elapsed)
+        else:
+            check = (
+                self.check_pooled if self.settings_dict['CONN_HEALTH_CHECKS']
+                else None
+            )
+            try:
+                connection = pool.acquire(check)
+            except PoolTimeout as error:
+                raise OperationalError(str(error)) from error
+            self.isolation_level = self.settings_dict['OPTIONS'].get(
+                'isolation_level', connection.isolation_level
+            )
+        self.checked_out_at = perf_counter()
+        return connection
+
+    @staticmethod
+    def check_pooled(connection):
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+        except Error:
+            return False
+        return True
+
+    def _close(self):
+        if self.connection is None:
+            return None
+        if self.checked_out_at is not None:
+            get_metrics(self.alias).observe(
+                'use', perf_counter() - self.checked_out_at
+            )
+            self.checked_out_at = None
+        pool = self.get_pool(self.get_connection_params())
+        try:
+            if pool is None:
+                return super()._close()
+            with self.wrap_database_errors:
+                pool.release(self.connection, self.reusable())
+        finally:
+            report_metrics()
+
+    def reusable(self):
+        """ Соединение посреди atomic остается у этой обертки до
+        отката, в пул его отдавать нельзя. Начатая транзакция
+        откатывается. """
+
+        if self.in_atomic_block:
+            return False
+        status = self.connection.info.transaction_status
+        if status == TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if status != TRANSACTION_STATUS_IDLE:
+            try:
+                self.connection.rollback()
+            except Error:
+                return False
+        return True
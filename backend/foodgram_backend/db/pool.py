@@ -0,0 +1,123 @@
+from collections import deque
+from threading import BoundedSemaphore, Lock
+from time import perf_counter
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionMetrics:
+    """ Счетчики соединений процесса: ожидание соединения (открытие
+    нового или выдача из пула) и время, пока оно занято потоком """
+
+    FIELDS = ('wait', 'use', 'connect')
+
+    def __init__(self):
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counts = dict.fromkeys(self.FIELDS, 0)
+            self.totals = dict.fromkeys(self.FIELDS, 0.0)
+            self.maximums = dict.fromkeys(self.FIELDS, 0.0)
+            self.timeouts = self.discarded = 0
+            self.started = perf_counter()
+
+    def observe(self, name, seconds):
+        with self.lock:
+            self.counts[name] += 1
+            self.totals[name] += seconds
+            self.maximums[name] = max(self.maximums[name], seconds)
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self.lock:
+            result = {
+                'period': round(perf_counter() - self.started, 3),
+                'timeouts': self.timeouts,
+                'discarded': self.discarded,
+            }
+            for name in self.FIELDS:
+                count = self.counts[name]
+                result[name] = {
+                    'count': count,
+                    'avg_ms': round(
+                        self.totals[name] / count * 1000 if count else 0, 3
+                    ),
+                    'max_ms': round(self.maximums[name] * 1000, 3),
+                }
+            return result
+
+
+class ConnectionPool:
+    """ Пул соединений процесса на size соединений.
+
+    Поток ждет свободное соединение не дольше timeout секунд, затем
+    получает PoolTimeout. Свободные соединения выдаются с конца, чтобы
+    реже просыпались давно простаивающие. """
+
+    def __init__(self, connect, size, timeout, metrics):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.metrics = metrics
+        self.idle = deque()
+        self.lock = Lock()
+        self.slots = BoundedSemaphore(size)
+
+    def acquire(self, check=None):
+        started = perf_counter()
+        if not self.slots.acquire(timeout=self.timeout):
+            self.metrics.count('timeouts')
+            raise PoolTimeout(
+                f'Нет свободного соединения за {self.timeout} с, '
+                f'размер пула {self.size}'
+            )
+        try:
+            connection = self.take(check)
+        except BaseException:
+            self.slots.release()
+            raise
+        self.metrics.observe('wait', perf_counter() - started)
+        return connection
+
+    def take(self, check):
+        while True:
+            with self.lock:
+                connection = self.idle.pop() if self.idle else None
+            if connection is None:
+                started = perf_counter()
+                connection = self.connect()
+                self.metrics.observe('connect', perf_counter() - started)
+                return connection
+            if not connection.closed and (check is None or check(connection)):
+                return connection
+            self.discard(connection)
+
+    def release(self, connection, reusable=True):
+        try:
+            if reusable and not connection.closed:
+                with self.lock:
+                    self.idle.append(connection)
+            else:
+                self.discard(connection)
+        finally:
+            self.slots.release()
+
+    def discard(self, connection):
+        self.metrics.count('discarded')
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, deque()
+        for connection in idle:
+            connection.close()
@@ -0,0 +1,30 @@
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+replica_alias = ContextVar('replica_alias', default=None)
+
+
+class ReplicaRouter:
+    """ Чтение идет в реплику, выбранную для текущего запроса в
+    replica_alias, запись и чтение вне таких запросов — в основную базу.
+    Запись задается явно: иначе Django записал бы объект, прочитанный
+    из реплики, обратно в нее. """
+
+    def db_for_read(self, model, **hints):
+        return replica_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,160 @@
+"""
+Настройки gunicorn для контейнера backend.
+
+    gunicorn -c foodgram_backend/gunicorn_conf.py
+
+Число воркеров считается по процессорам, доступным контейнеру. Приложение
+загружается в мастер-процессе до fork, воркеры делят его память по
+copy-on-write и после перезапуска по max_requests не импортируют Django
+заново. Время загрузки и память воркеров пишутся в лог при старте.
+"""
+
+import gc
+import math
+import os
+from time import perf_counter
+
+STARTED = perf_counter()
+
+CGROUP_QUOTAS = (
+    ('/sys/fs/cgroup/cpu.max', None),
+    ('/sys/fs/cgroup/cpu/cpu.cfs_quota_us',
+     '/sys/fs/cgroup/cpu/cpu.cfs_period_us'),
+)
+
+
+def read_first_line(path):
+    with open(path) as file:
+        return file.readline().split()
+
+
+def cpu_limit():
+    """ Процессоры с учетом cpuset и квоты CPU контейнера """
+
+    count = len(os.sched_getaffinity(0))
+    for quota_path, period_path in CGROUP_QUOTAS:
+        try:
+            values = read_first_line(quota_path)
+            if period_path:
+                values += read_first_line(period_path)
+            quota, period = values[:2]
+            if quota in ('max', '-1'):
+                return count
+            return min(count, max(1, math.ceil(int(quota) / int(period))))
+        except (OSError, ValueError):
+            continue
+    return count
+
+
+def since_process_start():
+    """ Секунды с запуска процесса, включая старт интерпретатора """
+
+    try:
+        with open('/proc/self/stat') as file:
+            started = int(file.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as file:
+            uptime = float(file.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    return uptime - started / os.sysconf('SC_CLK_TCK')
+
+
+def memory_usage():
+    """ Rss, Pss и разделяемая память процесса в МБ """
+
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as file:
+            for line in file:
+                name, *value = line.split()
+                if name in ('Rss:', 'Pss:', 'Shared_Clean:', 'Shared_Dirty:'):
+                    usage[name[:-1]] = int(value[0]) / 1024
+    except (OSError, ValueError, IndexError):
+        return 'нет данных'
+    shared = usage.pop('Shared_Clean', 0) + usage.pop('Shared_Dirty', 0)
+    usage['Shared'] = shared
+    return ', '.join(f'{name} {value:.1f} МБ' for name, value in usage.items())
+
+
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS') == 'True'
+CPUS = cpu_limit()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+
+if ASYNC_READ_VIEWS:
+    # Каждый воркер держит свой цикл событий и пул ASYNC_READ_WORKERS
+    # потоков, одного воркера на процессор достаточно.
+    wsgi_app = 'foodgram_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    workers = int(os.getenv('WEB_CONCURRENCY', CPUS))
+else:
+    # Потоки вместо 2 * CPU + 1 синхронных воркеров: ожидание базы и
+    # клиента не держит процесс целиком, а процессов и памяти меньше.
+    wsgi_app = 'foodgram_backend.wsgi:application'
+    worker_class = 'gthread'
+    workers = int(os.getenv('WEB_CONCURRENCY', CPUS + 1))
+    threads = int(os.getenv('GUNICORN_THREADS', 4))
+
+preload_app = True
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = timeout
+keepalive = 5
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+
+def on_starting(server):
+    """ Приложение уже загружено в мастере. Здесь же импортируются
+    URL и представления, иначе каждый воркер загрузил бы их отдельно на
+    первом запросе, и объекты замораживаются для сборщика мусора, чтобы
+    он не трогал страницы, общие с воркерами. """
+
+    if not server.cfg.preload_app:
+        return
+    from django.db import connections
+    from django.urls import get_resolver
+
+    loaded = perf_counter()
+    get_resolver().url_patterns
+    connections.close_all()
+    urls_loaded = perf_counter()
+    gc.collect()
+    gc.freeze()
+    server.log.info(
+        'Загрузка приложения %.2f с, импорт URL и представлений %.2f с, '
+        'объектов заморожено: %d',
+        loaded - STARTED, urls_loaded - loaded, gc.get_freeze_count()
+    )
+
+
+def when_ready(server):
+    process_start = since_process_start()
+    server.log.info(
+        'Сервер готов через %.2f с после запуска процесса (%.2f с после '
+        'чтения настроек): %s, воркеров %d, процессоров %d, '
+        'перезапуск воркера после %d±%d запросов',
+        process_start or 0, perf_counter() - STARTED,
+        server.cfg.worker_class_str, server.cfg.workers, CPUS,
+        server.cfg.max_requests, server.cfg.max_requests_jitter
+    )
+
+
+def post_fork(server, worker):
+    worker.forked_at = perf_counter()
+
+
+def post_worker_init(worker):
+    worker.log.info(
+        'Воркер %s готов через %.3f с после fork, память: %s',
+        worker.pid, perf_counter() - worker.forked_at, memory_usage()
+    )
+
+
+def worker_exit(server, worker):
+    from foodgram_backend.db.base import connection_metrics
+
+    for alias, metrics in connection_metrics().items():
+        worker.log.info(
+            'Воркер %s, соединения с базой %s: %s', worker.pid, alias, metrics
+        )
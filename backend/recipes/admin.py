@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from recipes.models import (
     Favorite, Ingredient, IngredientAmount, Recipe,
-    ShoppingCart, Tag
+    ShoppingCart, ShoppingListItem, Tag
 )
 
 
@@ -17,18 +17,15 @@ class IngredientInline(admin.TabularInline):
 
 
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author', 'total_favorites')
+    list_display = ('name', 'author', 'favorites_count')
     list_filter = ('author', 'name', 'tags')
     inlines = (IngredientInline,)
 
-    @admin.display(description='Всего в избранном')
-    def total_favorites(self, obj):
-        return Favorite.objects.filter(recipe=obj).count()
-
 
 admin.site.register(Favorite)
 admin.site.register(Ingredient, IngredientAdmin)
 admin.site.register(IngredientAmount)
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(ShoppingCart)
+admin.site.register(ShoppingListItem)
 admin.site.register(Tag)
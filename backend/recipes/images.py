@@ -0,0 +1,150 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from threading import Lock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True,
+             'progressive': True},
+}
+
+_executor = None
+_executor_lock = Lock()
+
+
+def rendition_name(source, size, extension):
+    stem = posixpath.splitext(posixpath.basename(source))[0]
+    return f'recipe_images/renditions/{stem}-{size}.{extension}'
+
+
+def render(source_file):
+    """ Уменьшенные копии изображения: {размер: {формат: байты}} """
+
+    with Image.open(source_file) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            background = Image.new('RGB', image.size, 'white')
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        renditions = {}
+        for size, box in settings.RECIPE_IMAGE_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail(box, Image.LANCZOS)
+            renditions[size] = {}
+            for extension, options in FORMATS.items():
+                buffer = BytesIO()
+                resized.convert('RGB').save(buffer, **options)
+                renditions[size][extension] = buffer.getvalue()
+        return renditions
+
+
+def process_recipe_image(recipe_id):
+    """ Строит копии изображения рецепта и сохраняет их пути.
+
+    Обработка идет вне транзакции, пути записываются, только если
+    изображение рецепта за это время не сменилось. Возвращает True,
+    если копии сохранены. """
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return False
+    source = recipe.image.name
+    storage = recipe.image.storage
+    try:
+        with storage.open(source) as source_file:
+            rendered = render(source_file)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        logger.warning(
+            'Не удалось обработать изображение %s рецепта %s',
+            source, recipe_id, exc_info=True
+        )
+        return False
+    renditions = {'source': source}
+    for size, files in rendered.items():
+        renditions[size] = {}
+        for extension, content in files.items():
+            name = rendition_name(source, size, extension)
+            if storage.exists(name):
+                storage.delete(name)
+            renditions[size][extension] = storage.save(
+                name, ContentFile(content)
+            )
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=recipe_id, image=source
+        ).first()
+        if recipe is None:
+            return False
+        previous = recipe.renditions
+        recipe.renditions = renditions
+        recipe.save(update_fields=('renditions', 'updated_at'))
+    delete_renditions(storage, previous, keep=renditions)
+    return True
+
+
+def delete_renditions(storage, renditions, keep=None):
+    keep = {
+        name for size, files in (keep or {}).items() if size != 'source'
+        for name in files.values()
+    }
+    for size, files in renditions.items():
+        if size == 'source':
+            continue
+        for name in files.values():
+            if name not in keep:
+                storage.delete(name)
+
+
+def is_pending(recipe):
+    return bool(recipe.image) and (
+        recipe.renditions.get('source') != recipe.image.name
+    )
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.RECIPE_IMAGE_WORKERS,
+                thread_name_prefix='recipe-images',
+            )
+        return _executor
+
+
+def run_in_worker(recipe_id):
+    try:
+        return process_recipe_image(recipe_id)
+    except Exception:
+        logger.exception('Ошибка обработки изображения рецепта %s', recipe_id)
+        return False
+    finally:
+        connections.close_all()
+
+
+def schedule(recipe_ids):
+    """ Отдает рецепты пулу потоков после коммита. Без пула
+    изображения обрабатывает команда process_recipe_images """
+
+    if not settings.RECIPE_IMAGE_WORKERS:
+        return
+    recipe_ids = list(recipe_ids)
+
+    def submit():
+        executor = get_executor()
+        for recipe_id in recipe_ids:
+            executor.submit(run_in_worker, recipe_id)
+
+    transaction.on_commit(submit)
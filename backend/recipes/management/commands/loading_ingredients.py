@@ -1,5 +1,6 @@
 import csv
 
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
 
 from recipes.models import Ingredient
@@ -18,3 +19,7 @@ class Command(BaseCommand):
                     measurement_unit=row[1],
                 ))
             Ingredient.objects.bulk_create(data)
+        call_command(
+            'response_cache', 'ingredients', '--invalidate',
+            stdout=self.stdout
+        )
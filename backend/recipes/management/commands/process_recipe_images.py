@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from recipes.images import is_pending, process_recipe_image, run_in_worker
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """ Строит уменьшенные копии изображений рецептов. """
+
+    help = (
+        'Обрабатывает изображения рецептов, для которых еще нет копий '
+        'нужных размеров. Подходит для запуска по расписанию, если пул '
+        'потоков в процессе приложения отключен.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'recipe_ids', nargs='*', type=int,
+            help='Обработать только указанные рецепты'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересобрать копии всех рецептов'
+        )
+        parser.add_argument('--workers', type=int, default=1)
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image='')
+        if options['recipe_ids']:
+            recipes = recipes.filter(pk__in=options['recipe_ids'])
+        recipes = recipes.only(
+            'pk', 'image', 'renditions'
+        ).order_by('pk').iterator(chunk_size=options['batch_size'])
+        recipe_ids = [
+            recipe.pk for recipe in recipes
+            if options['all'] or is_pending(recipe)
+        ]
+        if options['workers'] > 1:
+            with ThreadPoolExecutor(options['workers']) as executor:
+                processed = sum(executor.map(run_in_worker, recipe_ids))
+        else:
+            processed = sum(map(process_recipe_image, recipe_ids))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {processed} из {len(recipe_ids)}'
+        ))
@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    """ Сверяет и пересобирает суммы списков покупок. """
+
+    help = (
+        'Сравнивает сохраненные суммы ингредиентов списков покупок с '
+        'корзинами и пересобирает расхождения.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить, завершиться с ошибкой при расхождениях'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересобрать списки всех пользователей без сверки'
+        )
+
+    def handle(self, *args, **options):
+        if options['all']:
+            ShoppingListItem.objects.rebuild()
+            self.stdout.write(self.style.SUCCESS('Списки пересобраны'))
+            return
+        drifted = self.find_drift()
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        if options['check']:
+            raise CommandError(
+                f'Расхождения у {len(drifted)} пользователей'
+            )
+        ShoppingListItem.objects.rebuild(drifted)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобраны списки {len(drifted)} пользователей'
+        ))
+
+    @staticmethod
+    def find_drift():
+        """ Оба набора упорядочены по (user_id, ingredient_id), поэтому
+        сравниваются слиянием без загрузки в память. """
+
+        stored = ShoppingListItem.objects.order_by(
+            'user_id', 'ingredient_id'
+        ).values_list(
+            'user_id', 'ingredient_id', 'total_amount'
+        ).iterator(chunk_size=5000)
+        expected = ShoppingListItem.objects.expected().iterator(
+            chunk_size=5000
+        )
+        drifted = set()
+        stored_row = next(stored, None)
+        expected_row = next(expected, None)
+        while stored_row or expected_row:
+            if stored_row == expected_row:
+                stored_row = next(stored, None)
+                expected_row = next(expected, None)
+            elif expected_row is None or (
+                stored_row and stored_row[:2] < expected_row[:2]
+            ):
+                drifted.add(stored_row[0])
+                stored_row = next(stored, None)
+            elif stored_row is None or expected_row[:2] < stored_row[:2]:
+                drifted.add(expected_row[0])
+                expected_row = next(expected, None)
+            else:
+                drifted.add(stored_row[0])
+                stored_row = next(stored, None)
+                expected_row = next(expected, None)
+        return drifted
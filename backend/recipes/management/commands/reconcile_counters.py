@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from api.cache import invalidate
+from recipes.models import Favorite, IngredientAmount, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def actual_count(model, field):
+    """ Количество строк model, ссылающихся на текущий объект """
+
+    return Coalesce(
+        models.Subquery(
+            model.objects.filter(
+                **{field: models.OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=models.Count('pk')
+            ).values('total')
+        ),
+        0
+    )
+
+
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (Recipe, 'ingredients_count', IngredientAmount, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'followers_count', Subscription, 'author'),
+    (User, 'following_count', Subscription, 'user'),
+)
+
+
+class Command(BaseCommand):
+    """ Сверяет денормализованные счетчики с данными. """
+
+    help = (
+        'Пересчитывает счетчики избранного и ингредиентов у рецептов, '
+        'рецептов, '
+        'подписчиков и подписок у пользователей там, где они разошлись '
+        'с данными.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить, завершиться с ошибкой при расхождениях'
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        drifted = 0
+        for model, counter, related_model, field in COUNTERS:
+            actual = actual_count(related_model, field)
+            queryset = model.objects.exclude(**{counter: actual})
+            if options['check']:
+                rows = queryset.count()
+            else:
+                rows = queryset.update(
+                    **{counter: actual}, updated_at=timezone.now()
+                )
+            drifted += rows
+            self.stdout.write(
+                f'{model._meta.model_name}.{counter}: расхождений {rows}'
+            )
+        if options['check'] and drifted:
+            raise CommandError(f'Расхождений в счетчиках: {drifted}')
+        if drifted:
+            invalidate('recipes')
+        self.stdout.write(self.style.SUCCESS('Счетчики сверены'))
@@ -0,0 +1,314 @@
+import csv
+import io
+import math
+import random
+import time
+from array import array
+from datetime import datetime, timedelta, timezone
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import (
+    Favorite, FeedEntry, Ingredient, IngredientAmount, Recipe,
+    ShoppingCart, ShoppingListItem, Tag
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Петр', 'Ольга', 'Сергей', 'Елена')
+LAST_NAMES = ('Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Соколов', 'Орлов')
+DISHES = ('Суп', 'Салат', 'Пирог', 'Каша', 'Рагу', 'Запеканка', 'Омлет')
+START_DATE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+COPY_NULL = r'\N'
+
+
+class Command(BaseCommand):
+    """ Генерирует синтетические данные нагрузочного объема. """
+
+    help = (
+        'Заполняет базу пользователями, тегами, рецептами, избранным, '
+        'списками покупок, подписками и лентами. Ингредиенты берутся из '
+        'базы, поэтому сначала нужно выполнить loading_ingredients.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--favorites', type=int, default=50000)
+        parser.add_argument('--shopping-carts', type=int, default=20000)
+        parser.add_argument('--subscriptions', type=int, default=20000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--prefix', default='seed',
+            help='Префикс имен пользователей и тегов'
+        )
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Загружать строки через COPY (только PostgreSQL)'
+        )
+
+    def handle(self, *args, **options):
+        if options['copy'] and connection.vendor != 'postgresql':
+            raise CommandError('COPY доступен только для PostgreSQL')
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        if len(ingredient_ids) < options['ingredients_per_recipe']:
+            raise CommandError(
+                'Недостаточно ингредиентов, выполните loading_ingredients'
+            )
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.use_copy = options['copy']
+        prefix = options['prefix']
+
+        user_ids = self.seed_users(prefix, options['users'])
+        tag_ids = self.seed_tags(prefix, options['tags'])
+        recipe_ids = self.seed_recipes(
+            user_ids, options['recipes'], options['ingredients_per_recipe']
+        )
+        if not recipe_ids:
+            return
+        self.seed_recipe_tags(recipe_ids, tag_ids)
+        self.seed_ingredient_amounts(
+            recipe_ids, ingredient_ids, options['ingredients_per_recipe']
+        )
+        self.seed_pairs(
+            Favorite, user_ids, recipe_ids, options['favorites']
+        )
+        self.seed_pairs(
+            ShoppingCart, user_ids, recipe_ids, options['shopping_carts']
+        )
+        ShoppingListItem.objects.rebuild()
+        self.seed_subscriptions(user_ids, options['subscriptions'])
+        call_command('reconcile_counters', stdout=self.stdout)
+        FeedEntry.objects.rebuild()
+        call_command(
+            'response_cache', 'recipes', 'tags', '--invalidate',
+            stdout=self.stdout
+        )
+
+    def seed_users(self, prefix, count):
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix} уже есть, '
+                'укажите другой --prefix'
+            )
+        password = make_password(f'{prefix}-password')
+        rows = (
+            {
+                'username': f'{prefix}{number}',
+                'email': f'{prefix}{number}@foodgram.example',
+                'first_name': self.rng.choice(FIRST_NAMES),
+                'last_name': self.rng.choice(LAST_NAMES),
+                'password': password,
+                'date_joined': START_DATE,
+                'updated_at': START_DATE,
+            }
+            for number in range(count)
+        )
+        return self.write(User, rows, count, returning_ids=True)
+
+    def seed_tags(self, prefix, count):
+        colors = set(Tag.objects.values_list('color', flat=True))
+        tags = []
+        for number in range(count):
+            color = f'#{self.rng.randrange(0x1000000):06X}'
+            while color in colors:
+                color = f'#{self.rng.randrange(0x1000000):06X}'
+            colors.add(color)
+            tags.append(Tag(
+                name=f'{prefix} тег {number}',
+                slug=f'{prefix}-tag-{number}',
+                color=color,
+            ))
+        Tag.objects.bulk_create(tags)
+        return list(
+            Tag.objects.filter(
+                slug__startswith=f'{prefix}-tag-'
+            ).values_list('pk', flat=True)
+        ) or list(Tag.objects.values_list('pk', flat=True))
+
+    def seed_recipes(self, user_ids, count, ingredients_count):
+        if not user_ids:
+            return array('q')
+        step = timedelta(days=365) / max(count, 1)
+        rows = (
+            {
+                'name': f'{self.rng.choice(DISHES)} №{number}',
+                'author_id': self.rng.choice(user_ids),
+                'image': 'recipe_images/seed.png',
+                'text': 'Сгенерированный рецепт',
+                'cooking_time': self.rng.randint(1, 180),
+                'ingredients_count': ingredients_count,
+                'pub_date': START_DATE + step * number,
+                'updated_at': START_DATE + step * number,
+            }
+            for number in range(count)
+        )
+        return self.write(Recipe, rows, count, returning_ids=True)
+
+    def seed_recipe_tags(self, recipe_ids, tag_ids):
+        if not tag_ids:
+            return
+        through = Recipe.tags.through
+        rows = (
+            {'recipe_id': recipe_id, 'tag_id': tag_id}
+            for recipe_id in recipe_ids
+            for tag_id in self.rng.sample(
+                tag_ids, self.rng.randint(1, min(3, len(tag_ids)))
+            )
+        )
+        self.write(through, rows)
+
+    def seed_ingredient_amounts(self, recipe_ids, ingredient_ids, per_recipe):
+        rows = (
+            {
+                'recipe_id': recipe_id,
+                'ingredient_id': ingredient_id,
+                'amount': self.rng.randint(1, 500),
+            }
+            for recipe_id in recipe_ids
+            for ingredient_id in self.rng.sample(ingredient_ids, per_recipe)
+        )
+        self.write(IngredientAmount, rows, len(recipe_ids) * per_recipe)
+
+    def seed_pairs(self, model, user_ids, recipe_ids, count):
+        """ Уникальные пары пользователь-рецепт без хранения их в памяти:
+        номер пары проходит перестановку по модулю размера декартова
+        произведения. """
+
+        space = len(user_ids) * len(recipe_ids)
+        count = min(count, space)
+        if not count:
+            return
+        rows = (
+            {
+                'user_id': user_ids[index // len(recipe_ids)],
+                'recipe_id': recipe_ids[index % len(recipe_ids)],
+            }
+            for index in self.permutation(space, count)
+        )
+        self.write(model, rows, count)
+
+    def seed_subscriptions(self, user_ids, count):
+        others = len(user_ids) - 1
+        count = min(count, len(user_ids) * others) if others > 0 else 0
+        if not count:
+            return
+
+        def pair(index):
+            user_index, author_index = divmod(index, others)
+            if author_index >= user_index:
+                author_index += 1
+            return {
+                'user_id': user_ids[user_index],
+                'author_id': user_ids[author_index],
+            }
+
+        rows = (
+            pair(index)
+            for index in self.permutation(len(user_ids) * others, count)
+        )
+        self.write(Subscription, rows, count)
+
+    def permutation(self, space, count):
+        multiplier = self.rng.randrange(1, space) if space > 1 else 1
+        while math.gcd(multiplier, space) != 1:
+            multiplier += 1
+        offset = self.rng.randrange(space)
+        return (
+            (multiplier * index + offset) % space for index in range(count)
+        )
+
+    def write(self, model, rows, total=None, returning_ids=False):
+        """ Пишет строки пачками через COPY или многострочный INSERT,
+        незаданные поля заполняются значениями по умолчанию. """
+
+        fields = [
+            field for field in model._meta.concrete_fields
+            if not field.primary_key
+        ]
+        table = model._meta.db_table
+        last_id = (
+            model.objects.order_by('-pk').values_list('pk', flat=True).first()
+            or 0
+        )
+        started = time.monotonic()
+        written = 0
+        rows = iter(rows)
+        with transaction.atomic():
+            while True:
+                batch = [
+                    [self.prepare(field, row) for field in fields]
+                    for row in islice(rows, self.batch_size)
+                ]
+                if not batch:
+                    break
+                if self.use_copy:
+                    self.copy_batch(table, fields, batch)
+                else:
+                    self.insert_batch(table, fields, batch)
+                written += len(batch)
+                if total:
+                    self.stdout.write(
+                        f'\r{table}: {written}/{total}', ending=''
+                    )
+        self.stdout.write(self.style.SUCCESS(
+            f'\r{table}: {written} строк за '
+            f'{time.monotonic() - started:.1f} с'
+        ))
+        if returning_ids:
+            return array('q', model.objects.filter(
+                pk__gt=last_id
+            ).order_by('pk').values_list('pk', flat=True).iterator())
+
+    @staticmethod
+    def prepare(field, row):
+        if field.attname in row:
+            value = row[field.attname]
+        else:
+            value = field.get_default()
+        return field.get_db_prep_save(value, connection)
+
+    @staticmethod
+    def insert_batch(table, fields, batch):
+        quote = connection.ops.quote_name
+        columns = ', '.join(quote(field.column) for field in fields)
+        max_rows = connection.ops.bulk_batch_size(fields, batch)
+        placeholders = f'({", ".join(["%s"] * len(fields))})'
+        with connection.cursor() as cursor:
+            for start in range(0, len(batch), max_rows):
+                chunk = batch[start:start + max_rows]
+                cursor.execute(
+                    f'INSERT INTO {quote(table)} ({columns}) VALUES '
+                    + ', '.join([placeholders] * len(chunk)),
+                    [value for row in chunk for value in row]
+                )
+
+    @staticmethod
+    def copy_batch(table, fields, batch):
+        quote = connection.ops.quote_name
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in batch:
+            writer.writerow(
+                COPY_NULL if value is None else value for value in row
+            )
+        buffer.seek(0)
+        columns = ', '.join(quote(field.column) for field in fields)
+        with connection.cursor() as cursor:
+            cursor.cursor.copy_expert(
+                f'COPY {quote(table)} ({columns}) FROM STDIN '
+                f"WITH (FORMAT csv, NULL '{COPY_NULL}')",
+                buffer
+            )
@@ -0,0 +1,53 @@
+# Generated by Django 4.1.4 on 2026-10-17 04:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feed(apps, schema_editor):
+    """ Ленты по текущим подпискам, кроме авторов, рецепты которых
+    читаются напрямую """
+
+    FeedEntry = apps.get_model('recipes', 'FeedEntry')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Subscription = apps.get_model('users', 'Subscription')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    quote = schema_editor.quote_name
+    schema_editor.execute(
+        f'INSERT INTO {quote(FeedEntry._meta.db_table)} (user_id, recipe_id) '
+        f'SELECT s.user_id, r.id FROM {quote(Subscription._meta.db_table)} s '
+        f'JOIN {quote(User._meta.db_table)} a ON a.id = s.author_id '
+        f'JOIN {quote(Recipe._meta.db_table)} r ON r.author_id = s.author_id '
+        'WHERE a.followers_count <= %s',
+        (settings.FEED_FANOUT_LIMIT,)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0009_ingredients_count'),
+        ('users', '0003_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_entries', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи лент',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feedentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_user_recipe'),
+        ),
+        migrations.RunPython(fill_feed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.1.4 on 2026-10-17 05:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_feedentry_pub_date'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-updated_at'], name='recipe_updated_at_idx'),
+        ),
+    ]
@@ -1,11 +1,31 @@
+from itertools import islice
+
 from colorfield.fields import ColorField
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models, router, transaction
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Coalesce, Greatest, RowNumber
+from django.utils import timezone
+
+from users.models import Subscription
 
 User = get_user_model()
 
+# Строк в одном upsert сумм списка покупок, по три параметра на строку.
+UPSERT_BATCH_SIZE = 300
+# Поля рецепта в подписках: краткий ответ и группировка по автору.
+LATEST_FIELDS = (
+    'id', 'name', 'image', 'renditions', 'cooking_time', 'author',
+    'pub_date'
+)
+# Поля рецепта, которые меняются только запросами к базе.
+DATABASE_FIELDS = frozenset(
+    ('favorites_count', 'ingredients_count', 'search_vector')
+)
+
 
 class Tag(models.Model):
     name = models.CharField(
@@ -32,6 +52,27 @@ class Tag(models.Model):
         return self.name
 
 
+class IngredientManager(models.Manager):
+    def search(self, query, limit=None, queryset=None):
+        """ Поиск по названию в queryset или во всех ингредиентах:
+        сначала точные совпадения, затем начинающиеся с запроса, затем
+        содержащие его """
+
+        limit = limit or settings.INGREDIENT_SEARCH_LIMIT
+        if queryset is None:
+            queryset = self.get_queryset()
+        return queryset.filter(
+            name__icontains=query
+        ).annotate(
+            rank=models.Case(
+                models.When(name__iexact=query, then=0),
+                models.When(name__istartswith=query, then=1),
+                default=2,
+                output_field=models.PositiveSmallIntegerField(),
+            )
+        ).order_by('rank', 'name')[:limit]
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         max_length=settings.MAX_LENGTH,
@@ -42,6 +83,7 @@ class Ingredient(models.Model):
         max_length=10,
         verbose_name='Единица измерения',
     )
+    objects = IngredientManager()
 
     class Meta:
         verbose_name = 'Ингредиент'
@@ -69,6 +111,143 @@ class RecipeManager(models.Manager):
             )),
         )
 
+    def with_related(self, user):
+        """ Рецепты со всеми связями для сериализации за фиксированное
+        число запросов """
+
+        queryset = (
+            self.with_annotations(user) if user.is_authenticated
+            else self.get_queryset()
+        )
+        return queryset.defer('search_vector').prefetch_related(
+            'tags',
+            models.Prefetch(
+                'ingredients_in_recipe',
+                queryset=IngredientAmount.objects.select_related('ingredient')
+            ),
+            models.Prefetch(
+                'author',
+                queryset=User.objects.with_is_subscribed(user)
+            ),
+        )
+
+    def with_state(self, user):
+        """ Поля, от которых кроме текста рецепта зависит его ответ:
+        по ним без сериализации строятся ETag и Last-Modified """
+
+        fields = [
+            'updated_at', 'author__updated_at', 'favorites_count',
+            'author__email',
+            'author__username', 'author__first_name', 'author__last_name',
+            'author__recipes_count', 'author__followers_count',
+            'author__following_count',
+        ]
+        if not user.is_authenticated:
+            return self.get_queryset().values_list(*fields)
+        return self.with_annotations(user).annotate(
+            is_subscribed=models.Exists(user.follower.filter(
+                author_id=models.OuterRef('author_id')
+            ))
+        ).values_list(
+            *fields, 'is_favorited', 'is_in_shopping_cart', 'is_subscribed'
+        )
+
+    def list_state(self, user):
+        """ Сводка, от которой зависят все списки рецептов: последние
+        изменения рецептов и авторов берутся по индексам updated_at,
+        счетчики и отметки избранного и подписок их тоже сдвигают. Для
+        пользователя добавляется размер и последняя строка его корзины.
+
+        Кортеж (updated_at рецептов, updated_at авторов, ...) или None,
+        если рецептов нет """
+
+        subqueries = {
+            'authors_updated_at': models.Subquery(
+                User.objects.order_by('-updated_at').values('updated_at')[:1]
+            ),
+        }
+        if user.is_authenticated:
+            cart = ShoppingCart.objects.filter(user=user).order_by().values(
+                'user'
+            )
+            subqueries['cart_size'] = models.Subquery(
+                cart.annotate(total=models.Count('pk')).values('total')
+            )
+            subqueries['cart_last'] = models.Subquery(
+                cart.annotate(last=models.Max('pk')).values('last')
+            )
+        return self.get_queryset().order_by('-updated_at').annotate(
+            **subqueries
+        ).values_list('updated_at', *subqueries).first()
+
+    def count_ingredients(self, **filters):
+        """ Пересчитывает число ингредиентов у рецептов """
+
+        return self.filter(**filters).update(ingredients_count=Coalesce(
+            models.Subquery(
+                IngredientAmount.objects.filter(
+                    recipe_id=models.OuterRef('pk')
+                ).order_by().values('recipe_id').annotate(
+                    total=models.Count('pk')
+                ).values('total')
+            ),
+            0
+        ))
+
+    def feed(self, user):
+        """ Ключи (pub_date, id) рецептов авторов, на которых подписан
+        пользователь: из его ленты по индексу (user, -pub_date, -recipe)
+        и отдельной выборкой у авторов, рецепты которых в ленты не
+        раздаются. Страница каждой выборки читается своим запросом """
+
+        return (
+            FeedEntry.objects.filter(user=user).values_list(
+                'pub_date', 'recipe_id'
+            ),
+            self.get_queryset().filter(
+                author_id__in=user.follower.filter(
+                    author__feed_fanout=False
+                ).values('author_id')
+            ).values_list('pub_date', 'id'),
+        )
+
+    def touch(self, **filters):
+        """ Отмечает изменение рецептов при правке связанных данных """
+
+        return self.filter(**filters).update(updated_at=timezone.now())
+
+    def latest_by_authors(self, author_ids, limit=None):
+        """ Последние рецепты каждого автора одним запросом: окно
+        ROW_NUMBER() по автору ограничивает число рецептов у каждого.
+        Читаются только поля краткого ответа, без текста и поискового
+        вектора """
+
+        recipes = self.get_queryset().filter(
+            author_id__in=author_ids
+        ).only(*LATEST_FIELDS)
+        if limit is None:
+            return recipes
+        ranked = recipes.annotate(
+            author_rank=models.Window(
+                expression=RowNumber(),
+                partition_by=models.F('author_id'),
+                order_by=(
+                    models.F('pub_date').desc(), models.F('id').desc()
+                ),
+            )
+        ).order_by()
+        sql, params = ranked.query.sql_with_params()
+        quote = connections[self.db].ops.quote_name
+        columns = ', '.join(
+            quote(self.model._meta.get_field(name).column)
+            for name in LATEST_FIELDS
+        )
+        return self.raw(
+            f'SELECT {columns} FROM ({sql}) ranked '
+            'WHERE author_rank <= %s ORDER BY pub_date DESC, id DESC',
+            (*params, limit)
+        )
+
 
 class Recipe(models.Model):
     name = models.CharField(
@@ -109,16 +288,70 @@ class Recipe(models.Model):
         ]
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
+    renditions = models.JSONField(
+        verbose_name='Копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Всего в избранном',
+        default=0,
+        editable=False,
+    )
+    ingredients_count = models.PositiveSmallIntegerField(
+        verbose_name='Число ингредиентов',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
     objects = RecipeManager()
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx',
+            ),
+            models.Index(
+                fields=('-updated_at',),
+                name='recipe_updated_at_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return self.name
 
+    def save(self, *args, **kwargs):
+        """ Счетчики и поисковый вектор пишутся в базе запросами
+        update(), сохранение существующего рецепта их не перезаписывает
+        значениями, прочитанными до правки """
+
+        if (
+            not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in DATABASE_FIELDS
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+
 
 class IngredientAmount(models.Model):
     recipe = models.ForeignKey(
@@ -152,6 +385,12 @@ class IngredientAmount(models.Model):
                 name='unique_recipe_ingredient',
             ),
         )
+        indexes = (
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='ingredient_recipe_idx',
+            ),
+        )
 
 
 class BaseListModel(models.Model):
@@ -200,3 +439,304 @@ class ShoppingCart(BaseListModel):
 
     def __str__(self):
         return f'Рецепт {self.recipe} в списке у {self.user}'
+
+
+def amount_deltas(old_amounts, new_amounts):
+    """ Изменения количеств вида {ingredient_id: amount} """
+
+    return {
+        ingredient_id: (
+            new_amounts.get(ingredient_id, 0)
+            - old_amounts.get(ingredient_id, 0)
+        )
+        for ingredient_id in new_amounts.keys() | old_amounts.keys()
+    }
+
+
+class ShoppingListItemManager(models.Manager):
+    @staticmethod
+    def recipe_amounts(recipe_id):
+        return dict(IngredientAmount.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('ingredient_id', 'amount'))
+
+    @transaction.atomic(savepoint=False)
+    def apply(self, user_ids, deltas):
+        """ Прибавляет к суммам ингредиентов пользователей изменения
+        вида {ingredient_id: amount}, обнуленные строки удаляются.
+
+        Прибавки пишутся одним upsert, так что одновременные добавления
+        не создают строку дважды, вычитания — одним UPDATE. """
+
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        added = {
+            ingredient_id: delta for ingredient_id, delta in deltas.items()
+            if delta > 0
+        }
+        removed = {
+            ingredient_id: delta for ingredient_id, delta in deltas.items()
+            if delta < 0
+        }
+        if added:
+            self.upsert(
+                (user_id, ingredient_id, delta)
+                for user_id in user_ids
+                for ingredient_id, delta in added.items()
+            )
+        if removed:
+            items = self.filter(
+                user_id__in=user_ids, ingredient_id__in=removed
+            )
+            items.update(total_amount=Greatest(
+                models.F('total_amount') + models.Case(
+                    *(
+                        models.When(
+                            ingredient_id=ingredient_id,
+                            then=models.Value(delta)
+                        )
+                        for ingredient_id, delta in removed.items()
+                    ),
+                    default=models.Value(0),
+                ),
+                0
+            ))
+            items.filter(total_amount=0).delete()
+
+    def upsert(self, rows):
+        """ INSERT ... ON CONFLICT (user_id, ingredient_id) DO UPDATE:
+        строки (user_id, ingredient_id, amount) прибавляются к суммам """
+
+        rows = iter(rows)
+        using = router.db_for_write(self.model)
+        quote = connections[using].ops.quote_name
+        table = quote(self.model._meta.db_table)
+        with connections[using].cursor() as cursor:
+            while batch := list(islice(rows, UPSERT_BATCH_SIZE)):
+                cursor.execute(
+                    f'INSERT INTO {table} '
+                    '(user_id, ingredient_id, total_amount) VALUES '
+                    f'{", ".join(["(%s, %s, %s)"] * len(batch))} '
+                    'ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+                    f'SET total_amount = {table}.total_amount '
+                    '+ EXCLUDED.total_amount',
+                    [value for row in batch for value in row]
+                )
+
+    def add_recipe(self, user_ids, recipe_id, sign=1):
+        user_ids = list(user_ids)
+        if user_ids:
+            self.apply(user_ids, {
+                ingredient_id: sign * amount for ingredient_id, amount
+                in self.recipe_amounts(recipe_id).items()
+            })
+
+    def apply_to_carts(self, recipe_id, deltas):
+        self.apply(
+            ShoppingCart.objects.filter(
+                recipe_id=recipe_id
+            ).values_list('user_id', flat=True),
+            deltas
+        )
+
+    @staticmethod
+    def expected(user_ids=None):
+        """ Суммы, посчитанные заново по корзинам """
+
+        queryset = IngredientAmount.objects.filter(
+            recipe__shopping_cart__isnull=False
+        )
+        if user_ids is not None:
+            queryset = queryset.filter(
+                recipe__shopping_cart__user_id__in=user_ids
+            )
+        return queryset.values(
+            'recipe__shopping_cart__user_id', 'ingredient_id'
+        ).annotate(
+            total=models.Sum('amount')
+        ).order_by(
+            'recipe__shopping_cart__user_id', 'ingredient_id'
+        ).values_list(
+            'recipe__shopping_cart__user_id', 'ingredient_id', 'total'
+        )
+
+    @transaction.atomic
+    def rebuild(self, user_ids=None, batch_size=5000):
+        stored = self.all()
+        if user_ids is not None:
+            stored = stored.filter(user_id__in=user_ids)
+        stored.delete()
+        items = (
+            self.model(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                total_amount=total,
+            )
+            for user_id, ingredient_id, total
+            in self.expected(user_ids).iterator(chunk_size=batch_size)
+        )
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+            self.bulk_create(batch)
+
+
+class ShoppingListItem(models.Model):
+    """ Сумма ингредиента по всем рецептам в списке покупок """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+    )
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списков покупок'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_user_ingredient',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} — {self.total_amount}'
+
+
+class FeedEntryManager(models.Manager):
+    def insert_from(self, pairs):
+        """ INSERT ... SELECT по выборке (user_id, recipe_id, pub_date)
+        одним запросом, уже существующие записи пропускаются """
+
+        using = router.db_for_write(self.model)
+        connection = connections[using]
+        sql, params = pairs.query.get_compiler(using).as_sql()
+        operations = connection.ops
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'{operations.insert_statement(OnConflict.IGNORE)} '
+                f'{operations.quote_name(self.model._meta.db_table)} '
+                '(user_id, recipe_id, pub_date) '
+                f'{sql} '
+                + operations.on_conflict_suffix_sql(
+                    None, OnConflict.IGNORE, None, None
+                ),
+                params
+            )
+
+    @staticmethod
+    def subscriber_recipes(**filters):
+        """ Подписчик, рецепт и дата его публикации для авторов,
+        рецепты которых раздаются по лентам """
+
+        return Subscription.objects.filter(
+            author__feed_fanout=True, **filters
+        ).order_by().values_list(
+            'user_id', 'author__recipes', 'author__recipes__pub_date'
+        )
+
+    def fan_out(self, recipe_ids):
+        """ Добавляет новые рецепты в ленты подписчиков их авторов """
+
+        self.insert_from(
+            self.subscriber_recipes(author__recipes__in=list(recipe_ids))
+        )
+
+    def backfill(self, user_id, author_id):
+        """ Последние рецепты автора в ленту нового подписчика """
+
+        self.insert_from(
+            self.subscriber_recipes(
+                user_id=user_id, author_id=author_id,
+                author__recipes__isnull=False,
+            ).order_by(
+                '-author__recipes__pub_date', '-author__recipes__id'
+            )[:settings.FEED_BACKFILL_SIZE]
+        )
+
+    def stop_fanout(self, author_id):
+        """ Автор, у которого подписчиков стало больше FEED_FANOUT_LIMIT,
+        переходит на чтение напрямую, его записи удаляются из лент.
+
+        Обратно при отписках он не возвращается: иначе каждая подписка
+        на границе порога переписывала бы ленты всех подписчиков, а
+        прочитанные напрямую рецепты пропадали бы из лент """
+
+        if User.objects.filter(
+            pk=author_id, feed_fanout=True,
+            followers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ).update(feed_fanout=False):
+            self.filter(recipe__author_id=author_id).delete()
+
+    def remove_author(self, user_id, author_id):
+        self.filter(user_id=user_id, recipe__author_id=author_id).delete()
+
+    @transaction.atomic
+    def rebuild(self):
+        """ Ленты заново, режим авторов — по текущему FEED_FANOUT_LIMIT """
+
+        limit = settings.FEED_FANOUT_LIMIT
+        User.objects.filter(
+            feed_fanout=True, followers_count__gt=limit
+        ).update(feed_fanout=False)
+        User.objects.filter(
+            feed_fanout=False, followers_count__lte=limit
+        ).update(feed_fanout=True)
+        self.all().delete()
+        self.insert_from(
+            self.subscriber_recipes(author__recipes__isnull=False)
+        )
+
+
+class FeedEntry(models.Model):
+    """ Рецепт в ленте подписчика, запись создается при публикации """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта',
+    )
+    objects = FeedEntryManager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи лент'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_user_recipe',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_user_pub_date_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'Рецепт {self.recipe} в ленте {self.user}'
@@ -0,0 +1,206 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import F, QuerySet
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from recipes import images
+from recipes.models import (
+    Favorite, FeedEntry, Ingredient, IngredientAmount, Recipe, ShoppingCart,
+    ShoppingListItem, Tag
+)
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def origin_model(origin):
+    """ Модель, с удаления которой начался каскад """
+
+    if isinstance(origin, QuerySet):
+        return origin.model
+    return type(origin) if origin is not None else None
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, **kwargs):
+    if created:
+        ShoppingListItem.objects.add_recipe(
+            (instance.user_id,), instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, origin, **kwargs):
+    """ Каскадное удаление из корзины при удалении рецепта учитывается
+    в remove_recipe_from_shopping_lists одним запросом на всех
+    пользователей, а при удалении пользователя его суммы удаляются
+    каскадом. """
+
+    if origin_model(origin) is ShoppingCart:
+        ShoppingListItem.objects.add_recipe(
+            (instance.user_id,), instance.recipe_id, sign=-1
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_lists(instance, **kwargs):
+    ShoppingListItem.objects.add_recipe(
+        instance.shopping_cart.values_list('user_id', flat=True),
+        instance.pk,
+        sign=-1
+    )
+
+
+@receiver(pre_save, sender=IngredientAmount)
+def remember_amount(instance, **kwargs):
+    """ API пишет состав пакетно без сигналов и переносит изменения
+    сам, по одной строки меняются в админке и из кода """
+
+    instance.previous_amount = None
+    if instance.pk is not None:
+        instance.previous_amount = IngredientAmount.objects.filter(
+            pk=instance.pk
+        ).values_list('recipe_id', 'ingredient_id', 'amount').first()
+
+
+def direct_amount_change(instance, origin=None):
+    """ Изменения {recipe_id: {ingredient_id: delta}} от сохранения или
+    удаления одной строки состава. Каскад от рецепта или ингредиента
+    учитывают их сигналы, удаление queryset-ом — как и bulk-методы —
+    вызывающий код """
+
+    changes = defaultdict(lambda: defaultdict(int))
+    if origin is not None:
+        if isinstance(origin, IngredientAmount):
+            changes[instance.recipe_id][instance.ingredient_id] -= (
+                instance.amount
+            )
+        return changes
+    if getattr(instance, 'previous_amount', None) is not None:
+        recipe_id, ingredient_id, amount = instance.previous_amount
+        changes[recipe_id][ingredient_id] -= amount
+    changes[instance.recipe_id][instance.ingredient_id] += instance.amount
+    return changes
+
+
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def apply_amount_to_shopping_lists(instance, origin=None, **kwargs):
+    for recipe_id, deltas in direct_amount_change(instance, origin).items():
+        ShoppingListItem.objects.apply_to_carts(recipe_id, deltas)
+
+
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def recount_ingredients(instance, origin=None, **kwargs):
+    recipe_ids = direct_amount_change(instance, origin).keys()
+    if recipe_ids:
+        Recipe.objects.count_ingredients(pk__in=recipe_ids)
+
+
+def change_favorites_count(recipe_id, delta):
+    """ Кеш рецептов не сбрасывается: счетчики меняются слишком часто,
+    ответы с ними живут COUNTERS_CACHE_TIMEOUT. updated_at сдвигается
+    для Last-Modified """
+
+    Recipe.objects.filter(pk=recipe_id).update(
+        favorites_count=Greatest(F('favorites_count') + delta, 0),
+        updated_at=timezone.now(),
+    )
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(instance, created, **kwargs):
+    if created:
+        change_favorites_count(instance.recipe_id, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(instance, origin, **kwargs):
+    if origin_model(origin) is not Recipe:
+        change_favorites_count(instance.recipe_id, -1)
+
+
+def change_recipes_count(author_id, delta):
+    if author_id is not None:
+        User.objects.filter(pk=author_id).update(
+            recipes_count=Greatest(F('recipes_count') + delta, 0),
+            updated_at=timezone.now(),
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(instance, created, **kwargs):
+    if created:
+        change_recipes_count(instance.author_id, 1)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, **kwargs):
+    if created:
+        FeedEntry.objects.fan_out((instance.pk,))
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_image_processing(instance, **kwargs):
+    if images.is_pending(instance):
+        images.schedule((instance.pk,))
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(instance, **kwargs):
+    change_recipes_count(instance.author_id, -1)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(instance, created=False, **kwargs):
+    """ Тег выводится в рецепте, его правка меняет рецепт """
+
+    if not created:
+        Recipe.objects.touch(tags=instance)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_ingredient_recipes(instance, created=False, **kwargs):
+    if not created:
+        Recipe.objects.touch(ingredients=instance)
+
+
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def touch_amount_recipes(instance, origin=None, **kwargs):
+    recipe_ids = direct_amount_change(instance, origin).keys()
+    if recipe_ids:
+        Recipe.objects.touch(pk__in=recipe_ids)
+
+
+@receiver(pre_delete, sender=Ingredient)
+def decrement_ingredients_count(instance, **kwargs):
+    """ Каскадное удаление строк состава их сигналы пропускают """
+
+    Recipe.objects.filter(ingredients=instance).update(
+        ingredients_count=Greatest(F('ingredients_count') - 1, 0)
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_feed(instance, created, **kwargs):
+    if created:
+        FeedEntry.objects.stop_fanout(instance.author_id)
+        FeedEntry.objects.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(pre_delete, sender=Subscription)
+def clear_feed(instance, **kwargs):
+    """ До удаления: при удалении автора его рецепты теряют ссылку на
+    него раньше, чем приходит post_delete подписок """
+
+    FeedEntry.objects.remove_author(instance.user_id, instance.author_id)
@@ -4,7 +4,8 @@ from users.models import CustomUser, Subscription
 
 
 class CustomUserAdmin(admin.ModelAdmin):
-    list_display = ('id', 'username', 'first_name', 'last_name', 'email')
+    list_display = ('id', 'username', 'first_name', 'last_name', 'email',
+                    'recipes_count', 'followers_count', 'following_count')
     list_filter = ('email', 'username')
     empty_value_display = '-пусто-'
 
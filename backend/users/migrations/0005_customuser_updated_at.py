@@ -0,0 +1,28 @@
+# Generated by Django 4.1.4 on 2026-10-17 05:40
+
+from django.db import migrations, models
+
+
+def fill_updated_at(apps, schema_editor):
+    User = apps.get_model('users', 'CustomUser')
+    User.objects.update(updated_at=models.F('date_joined'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_user_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['-updated_at'], name='user_updated_at_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.1.4 on 2026-10-17 06:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_feed_fanout(apps, schema_editor):
+    User = apps.get_model('users', 'CustomUser')
+    User.objects.filter(
+        followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).update(feed_fanout=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_customuser_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='feed_fanout',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Рецепты раздаются по лентам'),
+        ),
+        migrations.RunPython(fill_feed_fanout, migrations.RunPython.noop),
+    ]
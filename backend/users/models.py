@@ -1,9 +1,24 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
 
 from users.validators import username_validator
 
 
+class CustomUserManager(UserManager):
+    def with_is_subscribed(self, user):
+        """ Аннотирует пользователей признаком подписки на них """
+
+        if not user.is_authenticated:
+            return self.get_queryset().annotate(
+                is_subscribed=models.Value(False)
+            )
+        return self.get_queryset().annotate(
+            is_subscribed=models.Exists(Subscription.objects.filter(
+                user=user, author_id=models.OuterRef('pk')
+            ))
+        )
+
+
 class CustomUser(AbstractUser):
     """Кастомный пользователь"""
 
@@ -20,13 +35,50 @@ class CustomUser(AbstractUser):
         unique=True,
     )
 
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False,
+    )
+    following_count = models.PositiveIntegerField(
+        verbose_name='Подписок',
+        default=0,
+        editable=False,
+    )
+    feed_fanout = models.BooleanField(
+        verbose_name='Рецепты раздаются по лентам',
+        default=True,
+        editable=False,
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True,
+    )
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
 
+    objects = CustomUserManager()
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
         ordering = ('last_name', 'first_name')
+        indexes = (
+            models.Index(
+                fields=('last_name', 'first_name', 'id'),
+                name='user_name_id_idx',
+            ),
+            models.Index(
+                fields=('-updated_at',),
+                name='user_updated_at_idx',
+            ),
+        )
         constraints = [
             models.UniqueConstraint(
                 fields=['username', 'email'],
@@ -0,0 +1,33 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def change_subscription_counters(subscription, delta):
+    now = timezone.now()
+    User.objects.filter(pk=subscription.user_id).update(
+        following_count=Greatest(F('following_count') + delta, 0),
+        updated_at=now,
+    )
+    User.objects.filter(pk=subscription.author_id).update(
+        followers_count=Greatest(F('followers_count') + delta, 0),
+        updated_at=now,
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def increment_subscription_counters(instance, created, **kwargs):
+    if created:
+        change_subscription_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_subscription_counters(instance, **kwargs):
+    change_subscription_counters(instance, -1)